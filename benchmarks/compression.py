@@ -0,0 +1,107 @@
+"""Замер времени сохранения и размера книги по профилям сжатия.
+
+Книга повторяет таблицу «Краткий отчет» (6 столбцов) и записывается
+в режиме write-only библиотекой openpyxl и напрямую (excel_writer).
+Время формирования строк не учитывается - только сохранение книги.
+
+Запуск из директории, содержащей пакет excel_api:
+    python -m excel_api.benchmarks.compression [--rows 100000]
+
+Результат - строки таблицы раздела README «Сжатие книг Excel 2007+».
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+from io import BytesIO
+
+from openpyxl.styles import NamedStyle
+
+from ..excel_utils import Compression, Workbook
+from ..excel_writer import XlsxWorkbook
+
+HEADERS = ('№', 'Источник', 'Статус', 'Дата создания', 'Ссылка', 'Описание')
+WORDS = (
+    'нарушение', 'материал', 'пост', 'видео', 'ссылка', 'текст',
+    'обнаружен', 'канал',
+)
+STYLES = (
+    NamedStyle('header'),
+    NamedStyle('cell'),
+    NamedStyle('cell_datetime', number_format='dd.mm.yyyy hh:mm'),
+)
+COLUMN_STYLES = ('cell', 'cell', 'cell', 'cell_datetime', 'cell', 'cell')
+# Уникальные ссылки и описания записываются в ячейку (как в плане
+# таблицы генератора), повторяющиеся источники и статусы - общими строками
+SHARED_STRINGS = (True, True, True, True, False, False)
+
+
+def get_rows(count: int, seed: int=1) -> list:
+    """Строки таблицы (воспроизводимые при одинаковом seed)."""
+    rnd = random.Random(seed)
+    return [
+        (
+            i + 1,
+            f'src{i % 40}',
+            rnd.choice(('new', 'ok', 'sent', None)),
+            datetime(2020, 1, 1 + i % 28, i % 24, i % 60),
+            f'https://example.com/post/{i}?ref={rnd.getrandbits(40):x}',
+            ' '.join(rnd.choice(WORDS) for _ in range(12)),
+        )
+        for i in range(count)
+    ]
+
+
+def save_openpyxl(rows: list, compression: str) -> tuple:
+    wb = Workbook(write_only=True, compression=compression)
+    styles = wb.add_named_styles(STYLES)
+    sh = wb.create_sheet('Краткий отчет')
+    sh.append([sh.cell(header, styles['header']) for header in HEADERS])
+    for row in rows:
+        sh.append([
+            sh.cell(value, styles[style])
+            for value, style in zip(row, COLUMN_STYLES)
+        ])
+    return _save(wb)
+
+
+def save_native(rows: list, compression: str) -> tuple:
+    wb = XlsxWorkbook(compression=compression)
+    styles = wb.add_named_styles(STYLES)
+    sh = wb.create_sheet('Краткий отчет')
+    sh.shared_strings = SHARED_STRINGS
+    sh.append([(header, 'header') for header in HEADERS], styles)
+    for row in rows:
+        sh.append(list(zip(row, COLUMN_STYLES)), styles)
+    return _save(wb)
+
+
+def _save(wb) -> tuple:
+    """Время сохранения книги (с) и её размер (байт)."""
+    fd = BytesIO()
+    start = time.perf_counter()
+    wb.save(fd)
+    return time.perf_counter() - start, len(fd.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000,
+                        help='число строк таблицы')
+    args = parser.parse_args()
+
+    rows = get_rows(args.rows)
+    print('| Профиль    | zlib    | openpyxl, с | native, с | Размер, МиБ |')
+    print('|------------|---------|-------------|-----------|-------------|')
+    for profile in (Compression.FASTEST, Compression.BALANCED,
+                    Compression.SMALLEST, Compression.STORED):
+        level = Compression.ALL[profile][1]
+        openpyxl_time, _ = save_openpyxl(rows, profile)
+        native_time, size = save_native(rows, profile)
+        print(f'| {"`" + profile + "`":<10} | {level or "—":<7} '
+                f'| {openpyxl_time:<11.2f} | {native_time:<9.2f} '
+                f'| {size / 2 ** 20:<11.1f} |')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Пакетное приведение времени к числовому формату дат excel."""
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ExcelDateConverter:
+    """Приведение времени в секундах эпохи к местному времени
+    в числовом формате дат excel.
+
+    Смещения временной зоны pytz и моменты их смены вычисляются однажды,
+    поэтому столбец времени приводится без создания объектов datetime:
+    при наличии NumPy - векторно, иначе - с запоминанием интервала
+    смещения предыдущего значения (время в выборке обычно упорядочено).
+
+    Args:
+        tz (tzinfo): Временная зона pytz.
+
+    """
+    # Начало эпохи UNIX (1970-01-01) в числовом формате дат excel
+    EPOCH_SERIAL = 25569
+    SECONDS_PER_DAY = 86400
+    UNIX_EPOCH = datetime(1970, 1, 1)
+
+    def __init__(self, tz):
+        transitions = getattr(tz, '_utc_transition_times', None)
+        if transitions:
+            # Моменты смены смещения (UTC) и смещения с этих моментов
+            self.transitions = array('d', (
+                (t - self.UNIX_EPOCH).total_seconds() for t in transitions))
+            self.offsets = array('d', (
+                info[0].total_seconds() for info in tz._transition_info))
+        else:
+            # Зона с постоянным смещением
+            self.transitions = array('d', (float('-inf'), ))
+            self.offsets = array('d', (
+                tz.utcoffset(self.UNIX_EPOCH).total_seconds(), ))
+
+    def _get_interval(self, ts: float) -> tuple:
+        """Интервал действия смещения, содержащий момент времени.
+
+        Returns:
+            tuple: Начало и конец интервала, смещение в сутках.
+
+        """
+        transitions = self.transitions
+        pos = bisect_right(transitions, ts) - 1
+        end = (transitions[pos + 1] if pos + 1 < len(transitions)
+                else float('inf'))
+        return (transitions[pos], end,
+                self.offsets[pos] / self.SECONDS_PER_DAY + self.EPOCH_SERIAL)
+
+    def to_excel(self, ts: float) -> float:
+        """Приведение одного значения времени (None - пустое значение)."""
+        if ts is None:
+            return None
+        return ts / self.SECONDS_PER_DAY + self._get_interval(ts)[2]
+
+    def __call__(self, timestamps):
+        """Приведение столбца времени.
+
+        Args:
+            timestamps (sequence of number): Время в секундах эпохи
+                (list, tuple, array.array или numpy.ndarray).
+
+        Returns:
+            array or list: Массив чисел дат excel (array 'd'),
+                при наличии пустых значений - список с None.
+
+        """
+        if numpy is not None:
+            return self._convert_numpy(timestamps)
+
+        # Пустой начальный интервал
+        start = end = base = 0.0
+        seconds_per_day = self.SECONDS_PER_DAY
+        result = []
+        has_null = False
+        for ts in timestamps:
+            if ts is None:
+                result.append(None)
+                has_null = True
+                continue
+            if not start <= ts < end:
+                start, end, base = self._get_interval(ts)
+            result.append(ts / seconds_per_day + base)
+
+        return result if has_null else array('d', result)
+
+    def _convert_numpy(self, timestamps):
+        # Пустые значения становятся NaN
+        values = numpy.asarray(timestamps, dtype='float64')
+        pos = numpy.searchsorted(self.transitions, values, side='right') - 1
+        offsets = numpy.asarray(self.offsets)[numpy.maximum(pos, 0)]
+        result = ((values + offsets) / self.SECONDS_PER_DAY
+                    + self.EPOCH_SERIAL)
+
+        nulls = numpy.isnan(values)
+        if nulls.any():
+            return [None if null else value
+                    for value, null in zip(result.tolist(), nulls.tolist())]
+
+        dates = array('d')
+        dates.frombytes(result.tobytes())
+        return dates
@@ -1,15 +1,48 @@
-from datetime import datetime
+import asyncio
+import multiprocessing
+import os
+import threading
+from array import array
+from collections.abc import Mapping
+from concurrent.futures import Executor, ProcessPoolExecutor, wait
+from copy import copy
+from datetime import date, datetime, time, timedelta
 from io import BytesIO
+from itertools import islice, repeat
+from tempfile import NamedTemporaryFile
+from weakref import WeakKeyDictionary
 from urllib.parse import quote_plus
 
 from aiohttp import web
 from openpyxl.utils import get_column_letter
 from pytz import timezone
-from xlrd import open_workbook
-
-from .excel_utils import Workbook, Style
+from sqlalchemy import sql
+from xlrd import (
+    XL_CELL_BLANK,
+    XL_CELL_BOOLEAN,
+    XL_CELL_DATE,
+    XL_CELL_EMPTY,
+    XL_CELL_ERROR,
+    open_workbook,
+    xldate_as_datetime,
+)
+from xlwt import (
+    Alignment as XlsAlignment,
+    Borders as XlsBorders,
+    Pattern as XlsPattern,
+    Workbook as XlsWorkbook,
+)
+
+from .excel_dates import ExcelDateConverter
+from .excel_utils import Compression, Workbook, Style
+from .excel_utils_2003 import Style2003
+from .excel_writer import XlsxWorkbook, XlsxWorksheet
+from .external_sort import ExternalSorter
 from .loggers import getLogger
-from .queries import get_object
+from .queries import get_object, iter_objects, iter_objects_server_side
+from .ref_cache import ReferenceCache
+from .report_cache import PartitionStore, ReportCache
+from .row_store import RowStore
 from .settings import get_config
 from .schema_validators import ValidError
 
@@ -23,6 +56,16 @@ class DataBaseKeys:
 class ReportBase:
     CONFIG = get_config()['reports']
 
+    @staticmethod
+    def _get_edg_key(key: str) -> str:
+        """Ключ отчета ЕДГ."""
+        return key + '_edg'
+
+    @staticmethod
+    def _get_smk_key(key: str) -> str:
+        """Ключ отчета СМК."""
+        return key + '_smk'
+
 
 class ReportFormat:
     EXCEL = 'xlsx'
@@ -42,11 +85,31 @@ class ReportFormat:
         EXCEL_2003: '.xls',
     }
 
+    # Профили сжатия книги Excel 2007+
+    COMPRESSION_DEFAULT = ReportBase.CONFIG.get('compression',
+                                                Compression.DEFAULT)
+    COMPRESSION = {
+        Compression.FASTEST:    'Быстрое сжатие',
+        Compression.BALANCED:   'Сбалансированное сжатие',
+        Compression.SMALLEST:   'Максимальное сжатие',
+        Compression.STORED:     'Без сжатия',
+    }
+    COMPRESSION_LIST = [{'id': k, 'name': v} for k, v in COMPRESSION.items()]
+
+
+class ExcelBackend:
+    # Книга openpyxl
+    OPENPYXL = 'openpyxl'
+    # Запись разметки SpreadsheetML напрямую, без объектов ячеек openpyxl
+    NATIVE = 'native'
+    DEFAULT = OPENPYXL
+
 
 class ExcelCell:
     CELL = 'cell'
     CELL_BIG = 'cell_big'
     CELL_PERCENT = 'cell_percent'
+    CELL_NUMBER = 'cell_number'
     CELL_DATE = 'cell_date'
     CELL_DATETIME = 'cell_datetime'
     HEADER = 'header'
@@ -78,12 +141,28 @@ class ExcelColumn(ExcelCell):
 
 
 class ExcelCellStyle:
+    """Стиль столбца таблицы.
+
+    Args:
+        header (PyxlStyle): Стиль ячейки шапки.
+        cell (PyxlStyle): Стиль ячеек данных.
+        column (str, optional): Тип столбца в соответствии с ExcelColumn
+            (по умолчанию - ExcelColumn.CELL).
+        width (int, optional): Дополнительная ширина столбца
+            (по умолчанию - 0).
+        shared_strings (bool, optional): Запись строк столбца через
+            таблицу общих строк книги (ExcelBackend.NATIVE). Выгодна для
+            повторяющихся значений; уникальный текст (описания, ссылки)
+            записывается в ячейки напрямую (по умолчанию - True).
+
+    """
     def __init__(self, header, cell, column: str=ExcelColumn.CELL,
-                    width: int=0):
+                    width: int=0, shared_strings: bool=True):
         self._header = header
         self._cell = cell
         self._column = column
         self._width = width + ExcelColumn.WIDTHS[column]
+        self._shared_strings = shared_strings
 
     @property
     def column(self):
@@ -101,12 +180,81 @@ class ExcelCellStyle:
     def cell(self):
         return self._cell
 
+    @property
+    def shared_strings(self):
+        return self._shared_strings
+
+
+class SortSpec:
+    """Элемент сортировки таблицы на стороне БД (ORDER BY).
+
+    Args:
+        column (str): Имя столбца результата запроса.
+        direction (str, optional): Направление сортировки
+            (по умолчанию - ASC).
+        nulls (str, optional): Положение пустых значений
+            (по умолчанию - как принято в БД).
+
+    """
+    __slots__ = ('column', 'direction', 'nulls')
+
+    # Направления сортировки
+    ASC = 'asc'
+    DESC = 'desc'
+    # Положение пустых значений
+    NULLS_FIRST = 'first'
+    NULLS_LAST = 'last'
+
+    def __init__(self, column: str, direction: str=ASC, nulls: str=None):
+        if direction not in (self.ASC, self.DESC):
+            raise ValueError(f'Unknown sort direction: {direction}')
+        if nulls not in (None, self.NULLS_FIRST, self.NULLS_LAST):
+            raise ValueError(f'Unknown nulls position: {nulls}')
+
+        self.column = column
+        self.direction = direction
+        self.nulls = nulls
+
+    def __repr__(self) -> str:
+        return (f'SortSpec({self.column!r}, {self.direction!r}, '
+                f'{self.nulls!r})')
+
+    def to_clause(self):
+        """Элемент ORDER BY запроса SQLAlchemy."""
+        clause = getattr(sql.column(self.column), self.direction)()
+        if self.nulls == self.NULLS_FIRST:
+            clause = clause.nullsfirst()
+        elif self.nulls == self.NULLS_LAST:
+            clause = clause.nullslast()
+        return clause
+
 
 class ExcelSheetBase(ExcelRow, ExcelColumn):
     # Директория хранения таблиц
     DIR                         = ReportBase.CONFIG['dir']
     # Ключи ячеек
     # Необходимые ключи
+    PUBLICATION_DATETIME        = 'publication_datetime'
+    CREATED_AT                  = 'created_at'
+    PROCESSED_AT                = 'processed_at'
+    SOURCE                      = 'source'
+    STATUS                      = 'status'
+    REGISTRY_STATUS             = 'registry_status'
+    SENT_VIOLATION              = 'sent_violation'
+    REQUIREMENT                 = 'requirement'
+    CATEGORIES                  = 'categories'
+    URL                         = 'url'
+    SOURCE_TYPE                 = 'source_type'
+    INFORMATION_ACCESS          = 'information_access'
+    INFORMATION_TYPES           = 'information_types'
+    TIMING                      = 'timing'
+    LANGUAGES                   = 'languages'
+    FSEM                        = 'fsem'
+    FEDERAL_DISTRICT            = 'federal_district'
+    REGION                      = 'region'
+    USER                        = 'user'
+    DESCRIPTION                 = 'description'
+    IS_MANUAL                   = 'is_manual'
 
     # Дополнительные Ключи
     # Номер строки
@@ -123,6 +271,13 @@ class ExcelSheetBase(ExcelRow, ExcelColumn):
     REPORT_SHORT                = REPORT + '_short'
     REPORT_FULL                 = REPORT + '_full'
     STATISTIC_REPORT            = STATISTIC + '_'
+    STATISTIC_SOURCES           = STATISTIC_REPORT + 'sources'
+    STATISTIC_CATEGORIES        = STATISTIC_REPORT + 'categories'
+    STATISTIC_SOURCE_TYPES      = STATISTIC_REPORT + 'source_types'
+    STATISTIC_INFORMATION_TYPES = STATISTIC_REPORT + 'information_types'
+    STATISTIC_TIMINGS           = STATISTIC_REPORT + 'timings'
+    STATISTIC_LANGUAGES         = STATISTIC_REPORT + 'languages'
+    STATISTIC_FSEM              = STATISTIC_REPORT + 'fsem'
     # Архитектура таблиц {'наименование стобца': 'ключ в массиве данных'}:
     _REPORT_SHORT = {
         '№':                    ROW_NUM,
@@ -145,6 +300,21 @@ class ExcelSheetBase(ExcelRow, ExcelColumn):
             # поля
         ),
     }
+    # Сортировка таблиц в БД (по столбцам результата запроса).
+    # Если задана, строки приходят отсортированными и SORT не применяется,
+    # например:
+    #   REPORT_SHORT: (
+    #       SortSpec(DB_CREATED_AT, SortSpec.DESC, SortSpec.NULLS_LAST),
+    #       SortSpec(DB_ID),
+    #   ),
+    SORT_SPECS = {
+        REPORT_SHORT: (
+            # элементы сортировки
+        ),
+        REPORT_FULL: (
+            # элементы сортировки
+        ),
+    }
     # Словарь данных таблиц
     ALL = {
         REPORT_SHORT: {
@@ -192,6 +362,11 @@ class ExcelSheetBase(ExcelRow, ExcelColumn):
         _sheet = cls.__get_sheet(sheet_key)
         return _sheet['sheet_name']
 
+    @classmethod
+    def _get_order_by(cls, sheet_key: str) -> list:
+        """Элементы ORDER BY запроса для сортировки таблицы в БД."""
+        return [spec.to_clause() for spec in cls.SORT_SPECS.get(sheet_key, ())]
+
     @classmethod
     def _has_field(cls, sheet_key: str, field: str) -> bool:
         """Проверка на наличие поля в Таблице."""
@@ -293,6 +468,42 @@ class ExcelSheetStyleBase(ExcelColors):
     _TOTAL = ExcelSheetBase.TOTAL
     _PERCENT = ExcelSheetBase.PERCENT
     STYLES = {}
+    # Число запоминаемых копий стилей с другими словарями STYLES
+    VARIANTS_SIZE = 8
+
+    def with_styles(self, styles: dict) -> 'ExcelSheetStyleBase':
+        """Стили таблиц со словарем стилей столбцов styles.
+
+        Общий экземпляр стилей генераторов не изменяется: возвращается
+        его копия со своим кэшем планов таблиц, запоминаемая
+        для словаря styles.
+
+        Args:
+            styles (dict): Словарь стилей столбцов.
+
+        Returns:
+            ExcelSheetStyleBase: Стили таблиц.
+
+        """
+        if styles is self.STYLES:
+            return self
+
+        variants = self.__dict__.setdefault('_variants', {})
+        try:
+            _styles, sheet = variants[id(styles)]
+            if _styles is styles:
+                return sheet
+        except KeyError:
+            pass
+
+        sheet = copy(self)
+        sheet.__dict__.pop('_variants', None)
+        sheet.__dict__.pop('_plans', None)
+        sheet.STYLES = styles
+        if len(variants) >= self.VARIANTS_SIZE:
+            variants.pop(next(iter(variants)))
+        variants[id(styles)] = (styles, sheet)
+        return sheet
 
     def get_style(self, column: str) -> ExcelCellStyle:
         try:
@@ -366,6 +577,7 @@ class ExcelSheetStyle(ExcelSheetStyleBase):
             header=header_style,
             cell=cell_big_style,
             column=ExcelSheetBase.CELL_BIG,
+            shared_strings=False,
         ),
         ExcelSheetBase.SOURCE_TYPE:             ExcelCellStyle(
             header=header_style,
@@ -408,6 +620,7 @@ class ExcelSheetStyle(ExcelSheetStyleBase):
             header=header_style,
             cell=cell_big_style,
             column=ExcelSheetBase.CELL_BIG,
+            shared_strings=False,
         ),
         # ExcelSheetBase.SOURCE_SYSTEM:           ExcelCellStyle(
         #     header=header_style,
@@ -441,6 +654,26 @@ class ExcelSheetStyle(ExcelSheetStyleBase):
         ExcelColors.YELLOW:                     yellow,
     }
 
+    # Матрица окрашенных стилей ячеек {(имя стиля, цвет): стиль}
+    COLOR_STYLES = lambda style, cell_styles, colors: {
+        (cell_style.name, color):               style(
+            f'{cell_style.name}_{color}',
+            style=cell_style,
+            pattern_fg_color=pattern_fg_color,
+        ).get_style()
+        for cell_style in cell_styles
+        for color, pattern_fg_color in colors.items()
+    }
+    # Окрашенные стили ячеек Excel 2003 {имя окрашенного стиля: стиль}
+    COLOR_STYLES_2003 = lambda style, cell_styles, colors: {
+        f'{name}_{color}':                      style(
+            style=cell_style,
+            pattern_fg_color=pattern_fg_color,
+        ).get_style()
+        for name, cell_style in cell_styles.items()
+        for color, pattern_fg_color in colors.items()
+    }
+
 
 class ExcelSheet(ExcelSheetStyleBase):
     STYLE = Style
@@ -470,6 +703,11 @@ class ExcelSheet(ExcelSheetStyleBase):
         border_b=STYLE.Border.THIN, border_t=STYLE.Border.THIN,
         border_r=STYLE.Border.THIN, border_l=STYLE.Border.THIN
     ).get_style()
+    CELL_NUMBER_STYLE = STYLE(
+        ExcelSheetBase.CELL_NUMBER,
+        style=CELL_STYLE,
+        number_format=STYLE.Format.NUMBER,
+    ).get_style()
     CELL_BIG_STYLE = STYLE(
         ExcelSheetBase.CELL_BIG,
         style=CELL_STYLE,
@@ -499,12 +737,29 @@ class ExcelSheet(ExcelSheetStyleBase):
         HEADER_STYLE, HEADER_SLIM_STYLE, CELL_STYLE, CELL_BIG_STYLE,
         CELL_PERCENT_STYLE, CELL_DATE_STYLE
     )
+    # Стили столбцов с датой и временем (признак времени отчета)
+    STYLES_DATETIME = ExcelSheetStyle.STYLES(
+        HEADER_STYLE, HEADER_SLIM_STYLE, CELL_STYLE, CELL_BIG_STYLE,
+        CELL_PERCENT_STYLE, CELL_DATETIME_STYLE
+    )
     COLORS = ExcelSheetStyle.COLORS(
         gray=STYLE.Color.GRAY,
         green=STYLE.Color.GREEN,
         red=STYLE.Color.RED,
         yellow=STYLE.Color.YELLOW,
     )
+    COLOR_STYLES = ExcelSheetStyle.COLOR_STYLES(
+        STYLE,
+        (
+            CELL_STYLE, CELL_BIG_STYLE, CELL_PERCENT_STYLE, CELL_DATE_STYLE,
+            CELL_DATETIME_STYLE,
+        ),
+        COLORS,
+    )
+    # Все именованные стили книги
+    NAMED_STYLES = (
+        list(ALL.values()) + [CELL_NUMBER_STYLE] + list(COLOR_STYLES.values())
+    )
 
     def get_height(self, row: str=ExcelRow.CELL) -> int:
         return ((self.ALL[row].font.size + ExcelRow.HEIGHTS[row])
@@ -514,19 +769,494 @@ class ExcelSheet(ExcelSheetStyleBase):
         cell = self.get_style(column)
         return (cell.header.font.size / 10) * (cell.width + len(column))
 
+    def get_plan(self, sheet_key: str, sheet: dict) -> 'ExcelSheetPlan':
+        """Получение скомпилированного плана таблицы.
+
+        План строится один раз на таблицу и пересобирается только при
+        смене архитектуры таблицы или словаря стилей STYLES.
+
+        Args:
+            sheet_key (str): Ключ таблицы.
+            sheet (dict): Архитектура таблицы
+                {'наименование стобца': 'ключ в массиве данных'}.
+
+        Returns:
+            ExcelSheetPlan: План таблицы.
+
+        """
+        plans = self.__dict__.setdefault('_plans', {})
+        try:
+            _sheet, _styles, plan = plans[sheet_key]
+            if _sheet is sheet and _styles is self.STYLES:
+                return plan
+        except KeyError:
+            pass
+
+        plan = ExcelSheetPlan(sheet, self)
+        plans[sheet_key] = (sheet, self.STYLES, plan)
+        return plan
+
+
+class ExcelSheet2003(ExcelSheetStyleBase):
+    """Стили таблиц книги Excel 2003.
+
+    Стили ячеек повторяют именованные стили ExcelSheet и доступны
+    по тем же именам, поэтому план таблицы (ExcelSheetPlan) подходит
+    для записи книг обоих форматов.
+    """
+    STYLE = Style2003
+
+    # Словарь стилей книги
+    HEADER_STYLE = STYLE(
+        font_size=14,
+        font_bold=True,
+        num_format_str=STYLE.Format.TEXT,
+        pattern_type=XlsPattern.SOLID_PATTERN,
+        pattern_fg_color=STYLE.Color.PERIWINKLE,
+        border_b=XlsBorders.MEDIUM, border_t=XlsBorders.MEDIUM,
+        border_r=XlsBorders.MEDIUM, border_l=XlsBorders.MEDIUM
+    ).get_style()
+    HEADER_SLIM_STYLE = STYLE(
+        style=HEADER_STYLE,
+        align_wrap=XlsAlignment.WRAP_AT_RIGHT,
+    ).get_style()
+    CELL_STYLE = STYLE(
+        font_size=12,
+        align_wrap=XlsAlignment.WRAP_AT_RIGHT,
+        num_format_str=STYLE.Format.TEXT,
+        pattern_type=XlsPattern.SOLID_PATTERN,
+        border_b=XlsBorders.THIN, border_t=XlsBorders.THIN,
+        border_r=XlsBorders.THIN, border_l=XlsBorders.THIN
+    ).get_style()
+    CELL_NUMBER_STYLE = STYLE(
+        style=CELL_STYLE,
+        num_format_str=STYLE.Format.NUMBER,
+    ).get_style()
+    CELL_BIG_STYLE = STYLE(
+        style=CELL_STYLE,
+        align_h=XlsAlignment.HORZ_LEFT,
+    ).get_style()
+    CELL_PERCENT_STYLE = STYLE(
+        style=CELL_STYLE,
+        num_format_str=STYLE.Format.PERCENTAGE_00,
+    ).get_style()
+    CELL_DATE_STYLE = STYLE(
+        style=CELL_STYLE,
+        num_format_str=ExcelSheet.CELL_DATE_STYLE.number_format,
+    ).get_style()
+    CELL_DATETIME_STYLE = STYLE(
+        style=CELL_STYLE,
+        num_format_str=ExcelSheet.CELL_DATETIME_STYLE.number_format,
+    ).get_style()
+
+    ALL = ExcelSheetStyle.ALL(
+        HEADER_STYLE, HEADER_SLIM_STYLE, CELL_STYLE, CELL_BIG_STYLE,
+        CELL_PERCENT_STYLE, CELL_DATE_STYLE, CELL_DATETIME_STYLE
+    )
+    COLORS = ExcelSheetStyle.COLORS(
+        gray=STYLE.Color.GRAY50,
+        green=STYLE.Color.GREEN,
+        red=STYLE.Color.RED,
+        yellow=STYLE.Color.YELLOW,
+    )
+    COLOR_STYLES = ExcelSheetStyle.COLOR_STYLES_2003(
+        STYLE,
+        {
+            ExcelSheetBase.CELL:            CELL_STYLE,
+            ExcelSheetBase.CELL_BIG:        CELL_BIG_STYLE,
+            ExcelSheetBase.CELL_PERCENT:    CELL_PERCENT_STYLE,
+            ExcelSheetBase.CELL_DATE:       CELL_DATE_STYLE,
+            ExcelSheetBase.CELL_DATETIME:   CELL_DATETIME_STYLE,
+        },
+        COLORS,
+    )
+    # Все стили книги по имени стиля ExcelSheet
+    XF_STYLES = dict(
+        ALL, **{ExcelSheetBase.CELL_NUMBER: CELL_NUMBER_STYLE}, **COLOR_STYLES
+    )
+
+
+class ExcelSheetPlan:
+    """Скомпилированный план таблицы.
+
+    Содержит упорядоченные ключи столбцов и разрешенные для них
+    параметры в виде плоских массивов, чтобы при записи строк
+    обращаться к ним только по индексу столбца.
+
+    Args:
+        sheet (dict): Архитектура таблицы
+            {'наименование стобца': 'ключ в массиве данных'}.
+        sheet_style (ExcelSheet): Стили таблицы.
+
+    """
+    __slots__ = (
+        'headers', 'keys', 'header_styles', 'cell_styles', 'widths',
+        'number_formats', 'shared_strings', 'null_style', 'number_style',
+        'colors',
+    )
+
+    def __init__(self, sheet: dict, sheet_style: ExcelSheet):
+        styles = [sheet_style.get_style(column) for column in sheet.values()]
+
+        # Шапка таблицы
+        self.headers = tuple(sheet.keys())
+        # Ключи словаря данных, используемых в таблице
+        self.keys = tuple(sheet.values())
+        # Имена стилей шапки и ячеек столбцов
+        self.header_styles = tuple(style.header.name for style in styles)
+        self.cell_styles = tuple(style.cell.name for style in styles)
+        # Ширина и формат чисел столбцов
+        self.widths = tuple(sheet_style.get_width(k) for k in self.keys)
+        self.number_formats = tuple(
+            style.cell.number_format for style in styles)
+        # Признаки записи строк столбцов через таблицу общих строк
+        self.shared_strings = tuple(style.shared_strings for style in styles)
+        # Стиль пустых ячеек и ячеек нумерованного столбца
+        self.null_style = sheet_style.CELL_STYLE.name
+        self.number_style = sheet_style.CELL_NUMBER_STYLE.name
+        # Имена стилей ячеек по цвету строки:
+        #   {цвет: (стиль пустой ячейки, стили столбцов)}
+        color_styles = sheet_style.COLOR_STYLES
+        self.colors = {None: (self.null_style, self.cell_styles)}
+        for color in sheet_style.COLORS:
+            self.colors[color] = (
+                color_styles[(self.null_style, color)].name,
+                tuple(
+                    color_styles[(name, color)].name
+                    for name in self.cell_styles
+                ),
+            )
+
+    def get_rows(self, sheet_data, null_symb, colored: str):
+        """Построчная выборка данных таблицы.
+
+        Каждая строка данных обходится ровно один раз: цвет строки
+        и стили её ячеек определяются один раз на строку.
+
+        Args:
+            sheet_data (iterable of dict or Mapping): Данные таблицы:
+                построчные (словарь на строку) или по столбцам
+                (см. get_column_rows).
+            null_symb (any): Заполнитель пустого значения ячейки.
+            colored (str): Ключ цвета строки в словаре данных.
+
+        Yields:
+            list of tuple: Строка таблицы в виде пар
+                (значение ячейки, имя стиля ячейки).
+
+        """
+        if isinstance(sheet_data, Mapping):
+            yield from self.get_column_rows(sheet_data, null_symb, colored)
+            return
+
+        colors = self.colors
+        number_style = self.number_style
+        # Нумерованный столбец не окрашивается
+        num_column = self.keys[0]
+        num_style = self.cell_styles[0]
+        data_keys = tuple(enumerate(self.keys[1:], start = 1))
+        # Счетчик нумерованного столбца
+        rc = 1
+
+        for d in sheet_data:
+            null_style, styles = colors[d.get(colored) or None]
+
+            # 1. Нумерованный столбец:
+            cell_data = d.get(num_column)
+            if cell_data is None:
+                row = [(rc, number_style)]
+                rc += 1
+            else:
+                row = [(cell_data, num_style)]
+
+            # 2. Столбцы с данными:
+            for cc, column in data_keys:
+                cell_data = d[column]
+
+                if cell_data is None:
+                    row.append((null_symb, null_style))
+                else:
+                    row.append((cell_data, styles[cc]))
+
+            yield row
+
+    @staticmethod
+    def _get_column(sheet_data: Mapping, key: str):
+        """Столбец данных таблицы (отсутствующий столбец пуст).
+
+        Массивы NumPy преобразуются в списки значений Python.
+        """
+        if key not in sheet_data:
+            return None
+
+        column = sheet_data[key]
+        if (not isinstance(column, (list, tuple, array))
+                and hasattr(column, 'tolist')):
+            column = column.tolist()
+
+        return column
+
+    def get_column_rows(self, sheet_data: Mapping, null_symb, colored: str):
+        """Построчная выборка данных таблицы, заданных по столбцам.
+
+        Строки собираются из столбцов по мере записи, словари строк
+        не создаются.
+
+        Args:
+            sheet_data (Mapping): Данные таблицы по столбцам
+                {ключ столбца: list, tuple, array.array или numpy.ndarray}.
+                Столбец цвета строки (colored) и нумерованный столбец
+                необязательны.
+            null_symb (any): Заполнитель пустого значения ячейки.
+            colored (str): Ключ столбца цвета строки.
+
+        Yields:
+            list of tuple: Строка таблицы в виде пар
+                (значение ячейки, имя стиля ячейки).
+
+        Raises:
+            ValueError: Столбцы данных разной длины.
+
+        """
+        columns = [
+            self._get_column(sheet_data, key)
+            for key in (colored,) + self.keys
+        ]
+        lengths = {len(column) for column in columns if column is not None}
+        if len(lengths) > 1:
+            raise ValueError(
+                f'Sheet data columns differ in length: {sorted(lengths)}')
+        # Нет ни одного столбца - нет и строк
+        if not lengths:
+            return
+
+        colors = self.colors
+        number_style = self.number_style
+        # Нумерованный столбец не окрашивается
+        num_style = self.cell_styles[0]
+        # Счетчик нумерованного столбца
+        rc = 1
+
+        for color, num_data, *row_data in zip(*(
+            repeat(None) if column is None else column for column in columns
+        )):
+            null_style, styles = colors[color or None]
+
+            # 1. Нумерованный столбец:
+            if num_data is None:
+                row = [(rc, number_style)]
+                rc += 1
+            else:
+                row = [(num_data, num_style)]
+
+            # 2. Столбцы с данными:
+            for cc, cell_data in enumerate(row_data, start = 1):
+                if cell_data is None:
+                    row.append((null_symb, null_style))
+                else:
+                    row.append((cell_data, styles[cc]))
+
+            yield row
+
+
+def write_sheet_part(plan: ExcelSheetPlan, sheet_data: list, null_symb,
+                        colored: str, styles: dict) -> tuple:
+    """Запись разметки строк таблицы в отдельном процессе.
+
+    Args:
+        plan (ExcelSheetPlan): План таблицы.
+        sheet_data (list of dict or Mapping): Данные таблицы.
+        null_symb (any): Заполнитель пустого значения ячейки.
+        colored (str): Ключ цвета строки в словаре данных.
+        styles (dict): Индексы стилей книги {имя стиля: индекс}.
+
+    Returns:
+        tuple: Путь к временному файлу разметки строк и число строк.
+
+    """
+    f = NamedTemporaryFile(delete=False)
+    try:
+        sh = XlsxWorksheet(None, None, f)
+
+        # Шапка таблицы:
+        sh.append(list(zip(plan.headers, plan.header_styles)), styles)
+        # Строки с данными:
+        sh.write_rows(plan.get_rows(sheet_data, null_symb, colored), styles)
+
+        return sh.detach()
+    except BaseException:
+        # Не оставляем временный файл прерванной записи
+        f.close()
+        os.unlink(f.name)
+        raise
+
+
+def generate_excel_bytes(generator_cls, kwargs: dict, styles: dict) -> tuple:
+    """Генерация и сохранение excel-книги в отдельном процессе.
+
+    Args:
+        generator_cls (type): Класс генератора (ExcelGenerator).
+        kwargs (dict): Аргументы генератора.
+        styles (dict): Стили столбцов таблиц (ExcelSheet.STYLES).
+
+    Returns:
+        tuple: Имя файла книги и её содержимое.
+
+    """
+    generator = generator_cls(**kwargs)
+    generator.EXCEL_SHEET = generator.EXCEL_SHEET.with_styles(styles)
+    generator.generate_excel()
+    generator.save_excel_to_fd()
+    return generator.fn, generator.fd.getvalue()
+
+
+async def _next_batch(batches):
+    """Очередной пакет асинхронного итератора (None - пакеты кончились)."""
+    try:
+        return await batches.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def iter_batches(batches, loop):
+    """Построчный обход асинхронного итератора пакетов строк
+    из потока исполнителя.
+
+    Пакеты читаются в цикле событий loop: следующий пакет запрашивается
+    до записи строк текущего, поэтому чтение и запись перекрываются.
+
+    Args:
+        batches (AsyncIterator of list): Пакеты строк таблицы.
+        loop (AbstractEventLoop): Цикл событий, в котором читаются пакеты.
+
+    Yields:
+        any: Строка таблицы.
+
+    """
+    exhausted = False
+    future = asyncio.run_coroutine_threadsafe(_next_batch(batches), loop)
+    try:
+        batch = future.result()
+        while batch is not None:
+            future = asyncio.run_coroutine_threadsafe(
+                _next_batch(batches), loop)
+            yield from batch
+            batch = future.result()
+        exhausted = True
+    finally:
+        # Запись прервана: дожидаемся чтения пакета и закрываем итератор
+        if not exhausted:
+            wait([future])
+            asyncio.run_coroutine_threadsafe(
+                batches.aclose(), loop).result()
+
+
+async def _limit_batches(batches, semaphore: asyncio.Semaphore):
+    """Чтение асинхронного итератора пакетов строк под семафором.
+
+    Семафор захватывается при запросе первого пакета (а не при создании
+    итератора: таблицы записываются по очереди) и освобождается после
+    чтения последнего пакета или закрытия итератора.
+    """
+    async with semaphore:
+        try:
+            async for batch in batches:
+                yield batch
+        finally:
+            await batches.aclose()
+
+
+class ResponseStream:
+    """Файлоподобный объект для потоковой выгрузки книги в ответ.
+
+    Книга сохраняется в него из потока исполнителя: данные копятся
+    в буфере и порциями по CHUNK_SIZE передаются в очередь цикла
+    событий, откуда отправляются клиенту. Ограниченная очередь
+    приостанавливает сохранение, пока клиент не заберет данные.
+
+    Args:
+        loop (AbstractEventLoop): Цикл событий, обслуживающий ответ.
+        queue (asyncio.Queue): Очередь порций данных.
+
+    """
+    # Размер порции данных, отправляемой клиенту
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, loop, queue: asyncio.Queue):
+        self._loop = loop
+        self._queue = queue
+        self._buffer = bytearray()
+        self._pos = 0
+        self._cancelled = False
+
+    def _put(self, chunk):
+        asyncio.run_coroutine_threadsafe(
+            self._queue.put(chunk), self._loop).result()
+
+    def write(self, data) -> int:
+        if self._cancelled:
+            raise IOError('Response stream is cancelled.')
+
+        self._buffer += data
+        self._pos += len(data)
+        if len(self._buffer) >= self.CHUNK_SIZE:
+            self.flush()
+
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        if self._buffer and not self._cancelled:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def close(self):
+        """Отправка остатка буфера и признака конца потока."""
+        try:
+            self.flush()
+        finally:
+            self._put(None)
+
+    def cancel(self):
+        """Прерывание сохранения книги (например, при отключении клиента).
+        """
+        self._cancelled = True
+
 
 class ExcelGenerator(ExcelSheetBase):
     """Генератор excel-файла.
 
     Args:
         violation_form (str): Форма нарушений в соответствии с ViolationForm.
-        data (dict, optional): Данные для выгрузки в excel.
+        data (dict, optional): Данные для выгрузки в excel
+            {ключ таблицы: данные}. Данные таблицы задаются построчно
+            (список словарей) или по столбцам ({ключ столбца: list,
+            array.array или numpy.ndarray}, см. ExcelSheetPlan).
         report_type (int, optional): Тип отчета в соответствии с
             Report (по умолчанию - Report.DEFAULT).
         report_format (int, optional): Формат отчета в соответствии с
             ReportFormat (по умолчанию - ReportFormat.DEFAULT).
         fd (BytesIO, optional): Файловый дискриптор для
             сохранения файла локально.
+        write_only (bool, optional): Потоковая генерация книги в режиме
+            write-only: строки сбрасываются во временный файл по мере
+            записи, и потребление памяти не зависит от числа строк
+            (по умолчанию - False).
+        backend (str, optional): Способ записи xlsx-книги в соответствии
+            с ExcelBackend (по умолчанию - ExcelBackend.DEFAULT).
+            ExcelBackend.NATIVE записывает строки сразу в XML-разметку
+            и всегда работает потоково.
+        processes (int, optional): Число процессов для параллельной
+            генерации таблиц книги ExcelBackend.NATIVE
+            (по умолчанию - 0, таблицы генерируются последовательно).
+        executor (Executor, optional): Исполнитель асинхронной генерации
+            книги: пул потоков или процессов (по умолчанию - None,
+            пул потоков цикла событий).
+        compression (str, optional): Профиль zip-сжатия книги
+            в соответствии с Compression
+            (по умолчанию - ReportFormat.COMPRESSION_DEFAULT).
 
     """
     # Excel нулевой символ
@@ -539,21 +1269,49 @@ class ExcelGenerator(ExcelSheetBase):
     DEFAULT_WB_NAME = Report.ALL_REPORTS[Report.DEFAULT]
     # Стили таблиц
     EXCEL_SHEET = ExcelSheet()
+    EXCEL_SHEET_2003 = ExcelSheet2003()
+    # Максимальное число строк таблицы Excel 2003
+    XLS_MAX_ROWS = 65536
+    # Максимальная длина имени таблицы Excel
+    SHEET_NAME_MAX_LEN = 31
+    # Число строк, после записи которых они сбрасываются во временный файл
+    XLS_FLUSH_ROWS = 1000
+    # Максимальное число порций книги в очереди потокового ответа
+    STREAM_QUEUE_SIZE = 8
+    # Максимальное число книг, одновременно генерируемых в исполнителе
+    MAX_CONCURRENCY = ReportBase.CONFIG.get('max_concurrency', 2)
+    # Семафоры генерации книг {цикл событий: семафор}
+    _semaphores = WeakKeyDictionary()
+    # Пулы процессов параллельной записи таблиц {число процессов: пул}
+    _pools = {}
+    _pools_lock = threading.Lock()
 
     def __init__(self,
         violation_form: str, data: dict = {},
         report_type: int = Report.DEFAULT,
         report_format: int = ReportFormat.DEFAULT,
-        fd: BytesIO = None
+        fd: BytesIO = None,
+        write_only: bool = False,
+        backend: str = ExcelBackend.DEFAULT,
+        processes: int = 0,
+        executor: Executor = None,
+        compression: str = ReportFormat.COMPRESSION_DEFAULT
     ):
         self.__violation_form = violation_form
         self._data = data
         self.report_type = report_type
         self.report_format = report_format
+        self.write_only = write_only
+        self.backend = backend
+        self.processes = processes
+        self.executor = executor
+        self.compression = compression
         # file descriptor
         self.__fd = fd
         # Excel-книга
         self.__wb = None
+        # Стили excel-книги {имя стиля: StyleArray}
+        self.__styles = {}
         # Имя файла/книги
         self.__fn = None
         self.__response = None
@@ -566,6 +1324,10 @@ class ExcelGenerator(ExcelSheetBase):
     def response(self) -> web.Response:
         return self.__response
 
+    @property
+    def is_native(self) -> bool:
+        return self.backend == ExcelBackend.NATIVE
+
     @property
     def wb(self) -> Workbook:
         return self.__wb
@@ -581,33 +1343,76 @@ class ExcelGenerator(ExcelSheetBase):
         return self.__fn
 
     def get_sheet(self, sheet_key: str) -> dict:
-        return self._get_sheet(self.violation_form, sheet_key)
+        return self._get_sheet(sheet_key)
 
     def get_sheet_name(self, sheet_key: str) -> str:
-        return self._get_sheet_name(self.violation_form, sheet_key)
+        return self._get_sheet_name(sheet_key)
+
+    def get_sheet_plan(self, sheet_key: str) -> ExcelSheetPlan:
+        return self.EXCEL_SHEET.get_plan(sheet_key, self.get_sheet(sheet_key))
 
     def get_sheet_data(self, sheet_key: str) -> list:
         return self._data.get(sheet_key, [])
 
+    def _get_picklable_data(self, sheet_key: str):
+        # Данные по столбцам передаются как есть, построчные - списком
+        # (в т.ч. итераторы слияния данных, выгруженных на диск)
+        sheet_data = self.get_sheet_data(sheet_key)
+        if isinstance(sheet_data, Mapping):
+            return sheet_data
+        return list(sheet_data)
+
     def has_field(self, sheet_key: str, field: str) -> bool:
-        return self._has_field(self.violation_form, sheet_key, field)
+        return self._has_field(sheet_key, field)
 
     def _to_xlsx(self):
+        """Конвертация сгенерированной ранее книги excel 2003 в excel 2007+.
+
+        Таблицы читаются по одной (on_demand) построчно и потоково
+        записываются в книгу в режиме write-only, поэтому в памяти
+        одновременно находится только одна таблица исходной книги.
+        Даты, числа и логические значения сохраняют свой тип.
+        """
         if self.report_format != ReportFormat.EXCEL:
             self.save_excel_to_fd()
-            wb = open_workbook(file_contents=self.fd.getvalue())
-            workbook = Workbook()
+            wb = open_workbook(file_contents=self.fd.getvalue(),
+                                on_demand=True)
+            workbook = Workbook(write_only=True, compression=self.compression)
+            date_format = self.EXCEL_SHEET.CELL_DATE_STYLE.number_format
+            datetime_format = self.EXCEL_SHEET.CELL_DATETIME_STYLE.number_format
 
             for i in range(0, wb.nsheets):
                 sh = wb.sheet_by_index(i)
-                sheet = workbook.active if i == 0 else workbook.create_sheet()
-                sheet.title = sh.name
+                sheet = workbook.create_sheet(title=sh.name)
 
                 for row in range(0, sh.nrows):
-                    for col in range(0, sh.ncols):
-                        sheet.cell(row=row + 1,
-                                column=col + 1).value = sh.cell_value(row, col)
-
+                    cells = []
+                    for value, cell_type in zip(sh.row_values(row),
+                                                sh.row_types(row)):
+                        if cell_type == XL_CELL_DATE:
+                            value = xldate_as_datetime(value, wb.datemode)
+                            cell = sheet.cell(value)
+                            cell.number_format = (
+                                datetime_format if value.time() != time.min
+                                else date_format)
+                            cells.append(cell)
+                            continue
+                        elif cell_type == XL_CELL_BOOLEAN:
+                            value = bool(value)
+                        elif cell_type in (XL_CELL_EMPTY, XL_CELL_BLANK,
+                                            XL_CELL_ERROR):
+                            value = None
+                        cells.append(value)
+
+                    sheet.append(cells)
+
+                wb.unload_sheet(i)
+
+            wb.release_resources()
+            # Книга и имя её файла соответствуют формату excel 2007+
+            file_type = ReportFormat.FILE_TYPE[self.report_format]
+            self.__fn = (self.fn[:-len(file_type)]
+                            + ReportFormat.FILE_TYPE[ReportFormat.EXCEL])
             self.__wb = workbook
 
     def save_excel(self):
@@ -655,11 +1460,23 @@ class ExcelGenerator(ExcelSheetBase):
         # Удаляем сформированную книгу
         self.__wb = None
 
+        return self._get_response()
+
+    def _get_response(self, etag: str=None) -> web.Response:
+        """Формирование ответа с вложением выгруженной в fd excel-книги.
+
+        Args:
+            etag (str, optional): ETag книги.
+
+        """
         # Формируем ответ с вложенной excel-книгой
         file_name = quote_plus(self.fn)
+        headers = {'Content-Disposition': f'attachment;filename={file_name}'}
+        if etag is not None:
+            headers['ETag'] = etag
         self.__response = web.Response(
             body=self.fd.getvalue(),
-            headers={'Content-Disposition': f'attachment;filename={file_name}'},
+            headers=headers,
             content_type='application/vnd.ms-excel',
         )
         logger.debug(
@@ -667,39 +1484,292 @@ class ExcelGenerator(ExcelSheetBase):
 
         return self.__response
 
-    def get_response(self) -> web.Response:
-        """Генерация excel-книги и формирование ответа с её вложением.
+    async def generate_stream_response(self, request: web.Request
+                                        ) -> web.StreamResponse:
+        """Потоковая выгрузка сгенерированной ранее книги в ответ.
+
+        Книга сохраняется в потоке исполнителя, а zip-поток отправляется
+        клиенту порциями по мере формирования, без промежуточного буфера.
+
+        Args:
+            request (Request): Запрос библиотеки aiohttp.
 
         Returns:
-            Response: Сформированный ответ библиотеки aiohttp
+            StreamResponse: Отправленный потоковый ответ библиотеки aiohttp
                 с вложенной excel-книгой.
 
         """
-        self.generate_excel()
-        return self.generate_response()
+        if self.fn is None:
+            errText = 'Error: Workbook does not exist. Genereate it first.'
+            logger.error(errText)
+            raise web.HTTPInternalServerError(text=errText)
 
-    def get_excel(self):
-        """Генерация excel-книги с последующим локальным сохранением.
-        """
-        self.generate_excel()
-        self.save_excel()
+        # Формируем ответ с вложенной excel-книгой
+        file_name = quote_plus(self.fn)
+        response = web.StreamResponse(
+            headers={'Content-Disposition': f'attachment;filename={file_name}'},
+        )
+        response.content_type = 'application/vnd.ms-excel'
+        await response.prepare(request)
+
+        # Книга уже выгружена в fd (в пуле процессов или из кэша)
+        if self.wb is None:
+            body = self.fd.getvalue()
+            for pos in range(0, len(body), ResponseStream.CHUNK_SIZE):
+                await response.write(
+                    body[pos:pos + ResponseStream.CHUNK_SIZE])
+        else:
+            await self._stream_workbook(response)
 
-    def generate_excel(self):
-        """Генерация excel-книги в зависимости от
-        требуемого формата отчета.
-        """
-        self.generate_excel_xlsx()
+        await response.write_eof()
 
-        # Чистим сформированный массив данных
-        self._data = {}
+        self.__response = response
+        logger.debug(
+            f'Streaming response done: {datetime.now().strftime("%H:%M:%S")}')
 
-    @staticmethod
-    def _format_wb_name(wb_name: str, report_format: str) -> str:
-        return (
-            f'{wb_name.replace(" ", "_")}__'
-            f'{datetime.now().strftime("%d_%m_%Y")}'
-            f'{ReportFormat.FILE_TYPE[report_format]}'
-        )
+        return self.__response
+
+    async def _stream_workbook(self, response: web.StreamResponse):
+        """Сохранение книги в исполнителе генератора с отправкой
+        zip-потока в ответ по мере формирования.
+        """
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue(maxsize=self.STREAM_QUEUE_SIZE)
+        stream = ResponseStream(loop, queue)
+        wb = self.wb
+
+        def save():
+            try:
+                wb.save(stream)
+            finally:
+                stream.close()
+
+        saving = asyncio.ensure_future(self._run_in_executor(save))
+
+        try:
+            chunk = await queue.get()
+            while chunk is not None:
+                await response.write(chunk)
+                chunk = await queue.get()
+        except BaseException:
+            # Прерываем сохранение и освобождаем очередь
+            stream.cancel()
+            while not saving.done():
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait([getter, saving],
+                                    return_when=asyncio.FIRST_COMPLETED)
+                getter.cancel()
+            # Ошибка прерванного сохранения ожидаема
+            if not saving.cancelled():
+                saving.exception()
+            raise
+        finally:
+            # Удаляем сформированную книгу
+            self.__wb = None
+
+        await saving
+
+    async def get_stream_response(self, request: web.Request
+                                    ) -> web.StreamResponse:
+        """Генерация excel-книги и потоковая выгрузка её в ответ.
+
+        Args:
+            request (Request): Запрос библиотеки aiohttp.
+
+        Returns:
+            StreamResponse: Отправленный потоковый ответ библиотеки aiohttp
+                с вложенной excel-книгой.
+
+        """
+        await self.generate_excel_async()
+        return await self.generate_stream_response(request)
+
+    def get_response(self) -> web.Response:
+        """Генерация excel-книги и формирование ответа с её вложением.
+
+        Returns:
+            Response: Сформированный ответ библиотеки aiohttp
+                с вложенной excel-книгой.
+
+        """
+        self.generate_excel()
+        return self.generate_response()
+
+    @classmethod
+    def _get_semaphore(cls) -> asyncio.Semaphore:
+        """Семафор генерации книг текущего цикла событий."""
+        loop = asyncio.get_event_loop()
+        try:
+            return cls._semaphores[loop]
+        except KeyError:
+            semaphore = cls._semaphores[loop] = asyncio.Semaphore(
+                cls.MAX_CONCURRENCY)
+            return semaphore
+
+    async def _run_in_executor(self, func, *args):
+        """Выполнение блокирующей функции в исполнителе генератора
+        с ограничением числа одновременных генераций.
+        """
+        loop = asyncio.get_event_loop()
+        async with self._get_semaphore():
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    def _set_excel(self, fn: str, body: bytes):
+        """Установка сформированной ранее (в другом процессе или
+        из кэша) книги, выгруженной в fd.
+        """
+        self.__fn = fn
+        self.__fd = BytesIO(body)
+        self.__wb = None
+
+    def _get_excel_job(self) -> tuple:
+        """Параметры генерации книги в отдельном процессе.
+
+        Подклассы с собственной архитектурой таблиц переопределяют
+        метод, возвращая свой класс генератора.
+
+        Returns:
+            tuple: Класс генератора, его аргументы и словарь стилей
+                столбцов (ExcelSheet.STYLES).
+
+        """
+        return (
+            ExcelGenerator,
+            {
+                'violation_form': self.violation_form,
+                'data': {
+                    sheet_key: self._get_picklable_data(sheet_key)
+                    for sheet_key in self._data
+                },
+                'report_type': self.report_type,
+                'report_format': self.report_format,
+                'write_only': self.write_only,
+                'backend': self.backend,
+                'compression': self.compression,
+            },
+            self.EXCEL_SHEET.STYLES,
+        )
+
+    async def _prepare_async_data(self, collect: bool=False):
+        """Подготовка данных таблиц, читаемых асинхронно (из БД),
+        к записи в исполнителе.
+
+        Асинхронные итераторы пакетов строк заменяются итераторами,
+        читающими пакеты в текущем цикле событий по мере записи строк
+        (iter_batches). Для записи в другом процессе строки собираются
+        в список заранее.
+
+        Args:
+            collect (bool, optional): Собрать строки в список.
+
+        Returns:
+            list: Созданные итераторы iter_batches.
+
+        """
+        loop = asyncio.get_event_loop()
+        iterators = []
+        for sheet_key, sheet_data in self._data.items():
+            if not hasattr(sheet_data, '__aiter__'):
+                continue
+
+            if collect:
+                self._data[sheet_key] = [
+                    row async for batch in sheet_data for row in batch]
+            else:
+                self._data[sheet_key] = iter_batches(sheet_data, loop)
+                iterators.append(self._data[sheet_key])
+
+        return iterators
+
+    async def generate_excel_async(self):
+        """Генерация excel-книги в исполнителе генератора.
+
+        В пуле процессов книга сразу сохраняется в fd: в текущий процесс
+        передается только её содержимое.
+        """
+        is_process = isinstance(self.executor, ProcessPoolExecutor)
+        iterators = await self._prepare_async_data(collect=is_process)
+
+        if is_process:
+            self._set_excel(*await self._run_in_executor(
+                generate_excel_bytes, *self._get_excel_job()))
+            self._data = {}
+        else:
+            def generate():
+                try:
+                    self.generate_excel()
+                finally:
+                    # Закрываем чтение из БД, если запись прервана
+                    for iterator in iterators:
+                        iterator.close()
+
+            await self._run_in_executor(generate)
+
+    async def save_excel_to_fd_async(self, fd=None):
+        """Выгрузка сгенерированной ранее книги в буфер
+        файлового дискриптора fd в исполнителе генератора.
+
+        Args:
+            fd (optional, any): Файловый дискриптор для выгрузки книги.
+
+        """
+        # Книга уже выгружена в пуле процессов
+        if self.wb is None and self.fn is not None:
+            if fd is not None:
+                fd.write(self.fd.getvalue())
+                self.__fd = fd
+            return
+
+        await self._run_in_executor(self.save_excel_to_fd, fd)
+
+    async def get_response_async(self) -> web.Response:
+        """Генерация excel-книги в исполнителе генератора
+        и формирование ответа с её вложением.
+
+        Returns:
+            Response: Сформированный ответ библиотеки aiohttp
+                с вложенной excel-книгой.
+
+        """
+        await self.generate_excel_async()
+        await self.save_excel_to_fd_async()
+
+        # Удаляем сформированную книгу
+        self.__wb = None
+
+        return self._get_response()
+
+    def get_excel(self):
+        """Генерация excel-книги с последующим локальным сохранением.
+        """
+        self.generate_excel()
+        self.save_excel()
+
+    def generate_excel(self):
+        """Генерация excel-книги в зависимости от
+        требуемого формата отчета.
+        """
+        if any(hasattr(d, '__aiter__') for d in self._data.values()):
+            errText = ('Error: Sheet data is read asynchronously. '
+                        'Use generate_excel_async.')
+            logger.error(errText)
+            raise web.HTTPInternalServerError(text=errText)
+
+        if self.report_format == ReportFormat.EXCEL_2003:
+            self.generate_excel_xls()
+        else:
+            self.generate_excel_xlsx()
+
+        # Чистим сформированный массив данных
+        self._data = {}
+
+    @staticmethod
+    def _format_wb_name(wb_name: str, report_format: str) -> str:
+        return (
+            f'{wb_name.replace(" ", "_")}__'
+            f'{datetime.now().strftime("%d_%m_%Y")}'
+            f'{ReportFormat.FILE_TYPE[report_format]}'
+        )
 
     def generate_excel_xlsx(self):
         """Генерация книги excel библиотеки openpyxl.
@@ -710,135 +1780,303 @@ class ExcelGenerator(ExcelSheetBase):
         # Имя excel-файла: wbName__дата.EXCEL_FILE_TYPE
         self.__fn = self._format_wb_name(wbName, ReportFormat.EXCEL)
         # Создаём excel-книгу
-        self.__wb = Workbook()
+        if self.is_native:
+            self.__wb = XlsxWorkbook(compression=self.compression)
+        else:
+            self.__wb = Workbook(write_only=self.write_only,
+                                    compression=self.compression)
+        # Регистрируем все стили книги (включая окрашенные) разом
+        self.__styles = self.__wb.add_named_styles(
+            self.EXCEL_SHEET.NAMED_STYLES)
 
-        # Удаляем дефолтную таблицу
-        self.__wb.remove_sheet(self.__wb.active)
+        # Удаляем дефолтную таблицу (в режиме write-only её нет)
+        if not self.__wb.write_only:
+            self.__wb.remove_sheet(self.__wb.active)
+
+        # Генерация таблиц книги в пуле процессов
+        if self.is_native and self.processes > 1 and len(self._data) > 1:
+            self._generate_excel_sheets_parallel()
+            return
 
         # Генерация таблиц книги
         for sheet_key in self._data.keys():
             self._generate_excel_sheet_xlsx(sheet_key)
 
-    def _generate_excel_sheet_xlsx(self, sheet_key: str):
-        """Генерация таблицы excel библиотеки openpyxl.
+    def generate_excel_xls(self):
+        """Генерация книги excel 2003 библиотеки xlwt.
         """
-        # Создаем страницу в книге кастомного класса ячеек
-        sheet_name = self.get_sheet_name(sheet_key)
-        sh = self.__wb.create_sheet(title = sheet_name)
+        # --------------Формирование excel-книги--------------
+        # Префекс наименования книги
+        wbName = self.WB_NAMES.get(self.report_type, self.DEFAULT_WB_NAME)
+        # Имя excel-файла: wbName__дата.EXCEL_2003_FILE_TYPE
+        self.__fn = self._format_wb_name(wbName, ReportFormat.EXCEL_2003)
+        # Создаём excel-книгу
+        self.__wb = XlsWorkbook(encoding='utf-8')
+        # Стили книги {имя стиля: XFStyle}
+        self.__styles = self.EXCEL_SHEET_2003.XF_STYLES
 
-        # Таблица параметров
-        SheetStyle = self.EXCEL_SHEET
-        sheet = self.get_sheet(sheet_key)
+        # Генерация таблиц книги
+        for sheet_key in self._data.keys():
+            self._generate_excel_sheet_xls(sheet_key)
 
-        # Шапка таблицы
-        sh_header = list(sheet.keys())
-        # Ключи словаря данных, используемых в таблице
-        sh_keys = list(sheet.values())
+    def _create_excel_sheet_xls(self, sheet_name: str, plan: ExcelSheetPlan,
+                                part: int=1):
+        """Создание таблицы книги excel 2003 с шапкой.
 
-        # ------------------Параметры таблицы------------------
-        # Начальный столбец таблицы
-        sh_start_column = 1
-        # Конечный столбец таблицы
-        sh_end_column = len(sh_header) + sh_start_column
-        # Начальная строка таблицы
-        sh_start_row = 1
+        Args:
+            sheet_name (str): Имя таблицы.
+            plan (ExcelSheetPlan): План таблицы.
+            part (optional, int): Номер части таблицы, не уместившейся
+                на одном листе (к имени листа добавляется суффикс).
+
+        Returns:
+            Worksheet: Созданная таблица библиотеки xlwt.
+
+        """
+        if part > 1:
+            suffix = f' ({part})'
+            sheet_name = (
+                sheet_name[:self.SHEET_NAME_MAX_LEN - len(suffix)] + suffix)
+        sh = self.__wb.add_sheet(sheet_name[:self.SHEET_NAME_MAX_LEN])
+
+        # Ширина столбцов (в 1/256 ширины символа)
+        for cn, width in enumerate(plan.widths):
+            sh.col(cn).width = int(width * 256)
+
+        # Шапка таблицы:
+        row = sh.row(0)
+        for cn, (header, style) in enumerate(zip(plan.headers,
+                                                    plan.header_styles)):
+            row.write(cn, header, self.__styles[style])
+
+        return sh
+
+    def _generate_excel_sheet_xls(self, sheet_key: str):
+        """Генерация таблицы excel 2003 библиотеки xlwt.
+
+        Строки записываются потоково: каждые XLS_FLUSH_ROWS строк
+        сбрасываются во временный файл таблицы. Строки, не уместившиеся
+        на листе (XLS_MAX_ROWS), переносятся на следующий лист
+        с той же шапкой.
+        """
+        logger.debug(f'Excel generation: {datetime.now().strftime("%H:%M:%S")}')
+
+        sheet_name = self.get_sheet_name(sheet_key)
+        plan = self.get_sheet_plan(sheet_key)
+        styles = self.__styles
+
+        rows = plan.get_rows(
+            self.get_sheet_data(sheet_key), self.NULL_SYMB_TO_CELL,
+            self.COLORED)
 
         # ------------------Заполнение таблицы------------------
         # Параметры:
         #   rn - row number,
-        #   rc - row counter,
         #   cn - column number,
-        #   cc - column counter.
-        rn = sh_start_row
+        #   part - номер листа таблицы.
+        part = 1
+        sh = self._create_excel_sheet_xls(sheet_name, plan, part)
+        rn = 1
+
+        for row in rows:
+            if rn == self.XLS_MAX_ROWS:
+                sh.flush_row_data()
+                part += 1
+                sh = self._create_excel_sheet_xls(sheet_name, plan, part)
+                rn = 1
+
+            sh_row = sh.row(rn)
+            for cn, (value, style) in enumerate(row):
+                # xlwt не поддерживает даты с часовым поясом
+                if isinstance(value, datetime) and value.tzinfo is not None:
+                    value = value.replace(tzinfo=None)
+                sh_row.write(cn, value, styles[style])
+
+            rn += 1
+            if rn % self.XLS_FLUSH_ROWS == 0:
+                sh.flush_row_data()
+
+        sh.flush_row_data()
 
-        logger.debug(f'Excel generation: {datetime.now().strftime("%H:%M:%S")}')
+        logger.debug(
+            f'Excel table is ready: {datetime.now().strftime("%H:%M:%S")}')
+
+    def _create_excel_sheet(self, sheet_key: str) -> tuple:
+        """Создание и предварительная настройка таблицы книги.
+
+        Returns:
+            tuple: Созданная таблица и её план (ExcelSheetPlan).
+
+        """
+        # Создаем страницу в книге кастомного класса ячеек
+        sheet_name = self.get_sheet_name(sheet_key)
+        sh = self.__wb.create_sheet(title = sheet_name)
+
+        # План таблицы
+        plan = self.get_sheet_plan(sheet_key)
 
-        # Предварительно заполним и настроим таблицу:
-        for cc, cn in enumerate(range(sh_start_column, sh_end_column)):
-            column = sh_keys[cc]
-            column_letter = get_column_letter(cn)
-            column_obj = sh.column_dimensions[column_letter]
+        # Предварительно настроим таблицу (до записи первой строки):
+        for cn, width in enumerate(plan.widths, start = 1):
+            column_obj = sh.column_dimensions[get_column_letter(cn)]
 
             # Установим ширину ячеек в соответстии с длиной заголовка:
-            width = SheetStyle.get_width(column)
             column_obj.width = width
 
-            # Заполним шапку таблицы:
-            sh.cell(rn, cn, sh_header[cc], SheetStyle.get_style(column).header)
+        return sh, plan
+
+    def _generate_excel_sheets_parallel(self):
+        """Генерация таблиц книги в пуле процессов.
+
+        Разметка строк каждой таблицы формируется в отдельном процессе,
+        а пакет книги собирается в текущем. Строки в таблицах,
+        сформированных параллельно, записываются в ячейки напрямую:
+        общую таблицу строк книги нельзя собрать из разных процессов.
+        """
+        logger.debug(f'Excel generation ({self.processes} processes): '
+                    f'{datetime.now().strftime("%H:%M:%S")}')
+
+        sheets = [
+            (*self._create_excel_sheet(sheet_key), sheet_key)
+            for sheet_key in self._data.keys()
+        ]
+
+        pool = self._get_pool(self.processes)
+        parts = [
+            pool.submit(
+                write_sheet_part, plan, self._get_picklable_data(sheet_key),
+                self.NULL_SYMB_TO_CELL, self.COLORED, self.__styles)
+            for _, plan, sheet_key in sheets
+        ]
+
+        attached = 0
+        try:
+            for (sh, _, _), part in zip(sheets, parts):
+                sh.attach(*part.result())
+                attached += 1
+        except BaseException:
+            self._remove_parts(parts[attached:])
+            raise
+
+        logger.debug(
+            f'Excel tables are ready: {datetime.now().strftime("%H:%M:%S")}')
+
+    @classmethod
+    def _get_pool(cls, max_workers: int) -> ProcessPoolExecutor:
+        """Общий пул процессов параллельной записи таблиц.
+
+        Пул создается однажды на число процессов. Процессы запускаются
+        методом forkserver (spawn, если он недоступен): ответвление
+        процесса с циклом событий и открытыми соединениями небезопасно.
+        """
+        with cls._pools_lock:
+            pool = cls._pools.get(max_workers)
+            # Пул сломан аварийным завершением процесса
+            if pool is None or pool._broken:
+                methods = multiprocessing.get_all_start_methods()
+                pool = cls._pools[max_workers] = ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context(
+                        'forkserver' if 'forkserver' in methods
+                        else 'spawn'),
+                )
+            return pool
+
+    @staticmethod
+    def _remove_parts(parts: list):
+        """Удаление временных файлов неподключенных частей таблиц."""
+        for part in parts:
+            part.cancel()
+        wait(parts)
+        for part in parts:
+            if part.cancelled() or part.exception() is not None:
+                continue
             try:
-                self.wb.add_named_style(SheetStyle.get_style(column).cell)
-            except ValueError:
+                os.unlink(part.result()[0])
+            except OSError:
                 pass
 
-        # Заполним таблицу:
-        sheet_data = self.get_sheet_data(sheet_key)
-        default_style = SheetStyle.CELL_STYLE
+    def _generate_excel_sheet_xlsx(self, sheet_key: str):
+        """Генерация таблицы excel библиотеки openpyxl.
 
-        # 1. Заполним нумерованный столбец:
-        rc = 1
-        column = sh_keys[0]
-        try:
-            for rn, d in enumerate(sheet_data, start = sh_start_row + 1):
-                cell_data = d[column]
+        В режиме write-only строки записываются потоково: после
+        добавления строки её ячейки больше не хранятся в памяти.
+        """
+        logger.debug(f'Excel generation: {datetime.now().strftime("%H:%M:%S")}')
 
-                # Если столбец - нумерованный список данных:
-                if cell_data is None:
-                    cell = sh.cell(rn, sh_start_column, rc, default_style.name)
-                    cell.number_format = Style.Format.NUMBER
-                    rc += 1
-                else:
-                    cell = sh.cell(rn, sh_start_column, cell_data,
-                                    SheetStyle.get_style(column).cell.name)
+        sh, plan = self._create_excel_sheet(sheet_key)
 
-        except KeyError:
-            for rn, d in enumerate(sheet_data, start = sh_start_row + 1):
-                cell = sh.cell(rn, sh_start_column, rc, default_style.name)
-                cell.number_format = Style.Format.NUMBER
-                rc += 1
+        # ------------------Параметры таблицы------------------
+        # Начальный столбец таблицы
+        sh_start_column = 1
+        # Начальная строка таблицы
+        sh_start_row = 1
 
-        logger.debug(
-            f'Excel preparing done: {datetime.now().strftime("%H:%M:%S")}')
+        rows = plan.get_rows(
+            self.get_sheet_data(sheet_key), self.NULL_SYMB_TO_CELL,
+            self.COLORED)
 
-        # 2. Заполним столбцы с данными:
-        for cc, cn in enumerate(
-            range(sh_start_column + 1, sh_end_column), start = 1
-        ):
-            column = sh_keys[cc]
-            column_style = SheetStyle.get_style(column).cell
+        # ------------------Заполнение таблицы------------------
+        # Параметры:
+        #   rn - row number,
+        #   cn - column number.
+        #   styles - стили книги по имени стиля.
+        styles = self.__styles
 
-            for rn, d in enumerate(sheet_data, start = sh_start_row + 1):
-                cell_data = d[column]
+        if self.is_native:
+            sh.shared_strings = plan.shared_strings
 
-                if cell_data is None:
-                    cell_data = self.NULL_SYMB_TO_CELL
-                    cell_style = default_style
-                else:
-                    cell_style = column_style
-
-                # Если есть цвет строки, устанавливаем новый стиль:
-                color = d.get(self.COLORED)
-                if color:
-                    try:
-                        style_name = f'{cell_style.name}_{color}'
-                        cell_style = self.wb._named_styles[style_name]
-                    except KeyError:
-                        cell_style = SheetStyle.STYLE(
-                            style_name,
-                            style = cell_style,
-                            pattern_fg_color = SheetStyle.COLORS[color],
-                        ).get_style()
-                        self.wb.add_named_style(cell_style)
-
-                cell = sh.cell(rn, cn, cell_data, cell_style.name)
+            # Шапка таблицы:
+            sh.append(list(zip(plan.headers, plan.header_styles)), styles)
+
+            # Строки с данными:
+            sh.write_rows(rows, styles)
+
+        elif self.write_only:
+            # Шапка таблицы:
+            sh.append([
+                sh.cell(header, styles[style])
+                for header, style in zip(plan.headers, plan.header_styles)
+            ])
+
+            # Строки с данными:
+            for row in rows:
+                sh.append([
+                    sh.cell(value, styles[style]) for value, style in row
+                ])
+
+        else:
+            # Шапка таблицы:
+            for cn, header in enumerate(plan.headers, start = sh_start_column):
+                sh.cell(sh_start_row, cn, header,
+                        styles[plan.header_styles[cn - sh_start_column]])
+
+            # Строки с данными:
+            for rn, row in enumerate(rows, start = sh_start_row + 1):
+                for cn, (value, style) in enumerate(row,
+                                                    start = sh_start_column):
+                    sh.cell(rn, cn, value, styles[style])
 
         logger.debug(
             f'Excel table is ready: {datetime.now().strftime("%H:%M:%S")}')
 
 
 class BaseGenerator(DataBaseKeys):
+    # Число строк в пакете при пакетном чтении из БД
+    FETCH_SIZE = ReportBase.CONFIG.get('fetch_size', 1000)
+    # Пакетное чтение из БД через серверный курсор
+    SERVER_SIDE_CURSOR = ReportBase.CONFIG.get('server_side_cursor', False)
+
     def __init__(self, app: dict, query, **kwargs):
         self.__app = app
         self._query = query
+        # Индекс исходных данных по идентификатору (строится по запросу)
+        self.__obj = None
+        # Блокировка получения исходных данных таблицами отчета
+        self.__obj_lock = None
+        # Запрос, которым получены исходные данные
+        self.__obj_query = None
+        # Версии полученных справочников {имя справочника: версия}
+        self.__ref_versions = {}
 
         self._data = {}
 
@@ -858,27 +2096,103 @@ class BaseGenerator(DataBaseKeys):
     def query(self):
         return self._query
 
+    @property
+    def refs(self) -> ReferenceCache:
+        """Кэш справочников приложения."""
+        return self.__app[ReferenceCache.APP_KEY]
+
+    @property
+    def ref_versions(self) -> dict:
+        return self.__ref_versions
+
+    @property
+    def obj_query(self):
+        """Запрос, которым получены исходные данные (после get_obj)."""
+        return self.__obj_query
+
+    @property
+    def obj(self) -> Mapping:
+        """Исходные данные по идентификатору (после get_obj)."""
+        if self.__obj is None:
+            self.__obj = self.obj_list.get_index('id')
+        return self.__obj
+
     # Необходимые аттрибуты
 
     @classmethod
     def bool_to_str(cls, value: bool) -> str:
         return '+' if value else cls.NULL_SYMB
 
-    async def get_obj(self, to_dict: bool = True):
+    async def get_obj(self, to_dict: bool = True, query=None):
         """Получаем списки исходных данных.
+
+        Данные читаются однажды: query учитывается только при первом
+        вызове (запрос полученных данных - obj_query).
+
+        Args:
+            to_dict (bool, optional): Вернуть данные по идентификатору.
+            query (Select, optional): Запрос данных
+                (по умолчанию - self.query).
+
         """
         if not hasattr(self, 'obj_list'):
-            # Получаем список данных из локальной БД
-            async with self.engine.acquire() as conn:
-                self.obj_list = await get_object(
-                    conn, self.query, True)
+            # Данные, получаемые одновременно несколькими таблицами,
+            # читаются из БД однажды
+            if self.__obj_lock is None:
+                self.__obj_lock = asyncio.Lock()
 
-            self.obj = {
-                v['id']: v for v in self.obj_list
-            }
+            async with self.__obj_lock:
+                if not hasattr(self, 'obj_list'):
+                    query = self.query if query is None else query
+                    self.obj_list = await self._fetch_obj(query)
+                    self.__obj_query = query
 
         return self.obj if to_dict else self.obj_list
 
+    async def get_refs(self, *names):
+        """Получаем справочники из кэша приложения в одноименные
+        атрибуты, например, self.languages (без запросов к БД,
+        пока справочник загружен).
+
+        Args:
+            *names (str): Имена справочников.
+
+        """
+        for name in names:
+            setattr(self, name, await self.refs.get(name))
+            self.__ref_versions[name] = self.refs.get_version(name)
+
+    async def _fetch_obj(self, query=None) -> RowStore:
+        """Получаем список данных из локальной БД
+        в компактное хранилище строк.
+        """
+        obj_list = RowStore()
+        if self.SERVER_SIDE_CURSOR:
+            async for rows in self.iter_obj(query):
+                obj_list.extend(rows)
+        else:
+            async with self.engine.acquire() as conn:
+                obj_list.extend(await get_object(
+                    conn, self.query if query is None else query, True))
+
+        return obj_list.compact()
+
+    async def iter_obj(self, query=None):
+        """Получаем исходные данные пакетами по FETCH_SIZE строк.
+
+        Args:
+            query (Select, optional): Запрос данных
+                (по умолчанию - self.query).
+
+        """
+        iter_func = (iter_objects_server_side if self.SERVER_SIDE_CURSOR
+                        else iter_objects)
+        query = self.query if query is None else query
+
+        async with self.engine.acquire() as conn:
+            async for obj_list in iter_func(conn, query, self.FETCH_SIZE):
+                yield obj_list
+
     # Определяем методы
     # ...
 
@@ -898,8 +2212,41 @@ class ReportGenerator(BaseGenerator, ExcelGenerator, ReportBase):
             (по умолчанию - False).
         fd (BytesIO, optional): Файловый дискриптор для
             сохранения файла локально.
+        stream (bool, optional): Потоковое чтение данных отчета из БД
+            во время записи книги (generate_excel_async)
+            (по умолчанию - False).
 
     """
+    # Московская временная зона для приведения времени
+    MSC_TIMEZONE = timezone('Europe/Moscow')
+    # Приведение времени к московскому в числовом формате дат excel
+    MSC_EXCEL_DATES = ExcelDateConverter(MSC_TIMEZONE)
+    # Столбцы выборки со временем в секундах эпохи, пакетно приводимые
+    # к московскому времени в числовом формате дат excel для строк отчета
+    TIMESTAMP_COLUMNS = ()
+    # Число строк, сортируемых в памяти (остальные сортируются на диске)
+    SORT_MAX_ROWS = ReportBase.CONFIG.get('sort_max_rows', 200000)
+    # Максимальное число таблиц отчета, данные которых формируются
+    # одновременно (и соединений пула, занятых отчетом)
+    SHEETS_CONCURRENCY = ReportBase.CONFIG.get('sheets_concurrency', 2)
+    # Кэш сформированных отчетов (размер по умолчанию - 1 ГиБ)
+    CACHE = ReportCache(
+        os.path.join(ExcelSheetBase.DIR, 'cache'),
+        ReportBase.CONFIG.get('cache_size', 1 << 30),
+    )
+    # Кэш дневных разделов данных отчетов (размер по умолчанию - 1 ГиБ)
+    PARTITIONS = PartitionStore(
+        os.path.join(ExcelSheetBase.DIR, 'partitions'),
+        ReportBase.CONFIG.get('partitions_size', 1 << 30),
+    )
+    # Столбец времени результата запроса для разбиения отчета по дням
+    # (None - отчет не разбивается)
+    PARTITION_COLUMN = None
+    # Версия формата строк отчета (её смена сбрасывает кэш разделов)
+    PARTITION_VERSION = 1
+    # Справочники (get_refs), используемые строками разделов: их версии
+    # входят в ключ раздела
+    PARTITION_REFS = ()
     # Цвета ячеек
     COLORS = ExcelColors
     _COLOR_PRE_TOTAL = COLORS.YELLOW
@@ -915,6 +2262,7 @@ class ReportGenerator(BaseGenerator, ExcelGenerator, ReportBase):
         report_format: int = ReportFormat.DEFAULT,
         time_column: bool = False,
         fd: BytesIO = None,
+        stream: bool = False,
         **kwargs
     ):
         ExcelGenerator.__init__(self,
@@ -930,84 +2278,467 @@ class ReportGenerator(BaseGenerator, ExcelGenerator, ReportBase):
         )
         self.sheets_list = sheets_list
         self.time_column = time_column
+        self.stream = stream
+        # Строки значений справочников:
+        #   {(справочник, версия, идентификаторы): строка}
+        self.__refs_cache = {}
 
     # Переопределяем методы, если требуется
     # ...
 
+    ####################### Значения справочников #######################
+    def get_ref_version(self, ref_name: str):
+        """Версия справочника, полученного get_refs.
+
+        Returns:
+            any: Версия справочника (None - справочник получен
+                не из кэша справочников приложения).
+
+        """
+        return self.ref_versions.get(ref_name)
+
+    def join_refs(self, ref_name: str, ids) -> str:
+        """Строка значений справочника по идентификаторам через DELIMITER.
+
+        Строка формируется однажды для каждого сочетания идентификаторов
+        и версии справочника.
+
+        Args:
+            ref_name (str): Имя атрибута справочника {идентификатор:
+                значение}, например, languages.
+            ids (iterable): Идентификаторы значений.
+
+        Returns:
+            str: Значения справочника через DELIMITER
+                (NULL_SYMB - идентификаторов нет).
+
+        Raises:
+            KeyError: Значения нет в справочнике.
+
+        """
+        if not ids:
+            return self.NULL_SYMB
+
+        ids = tuple(ids)
+        key = (ref_name, self.get_ref_version(ref_name), ids)
+        try:
+            return self.__refs_cache[key]
+        except KeyError:
+            ref = getattr(self, ref_name)
+            value = self.__refs_cache[key] = self.DELIMITER.join([
+                ref[v] for v in ids
+            ])
+            return value
+
+    ########################## Кэш отчетов ##########################
+    async def get_data_version(self):
+        """Версия исходных данных отчета, например, время последнего
+        изменения данных, выбираемых запросом.
+
+        Returns:
+            any: Версия данных (None - не кэшируются ни отчет,
+                ни дневные разделы его данных).
+
+        """
+        return None
+
+    def get_cache_key(self, data_version) -> str:
+        """Ключ кэша отчета: отпечаток параметров отчета и версии данных."""
+        sheets_list = self._optimise_sheets_list(
+            self.sheets_list + self.REPORTS.get(self.report_type, []))
+
+        return self.CACHE.fingerprint(
+            violation_form=self.violation_form,
+            report_type=self.report_type,
+            report_format=self.report_format,
+            sheets_list=set(sheets_list),
+            time_column=self.time_column,
+            compression=self.compression,
+            query=self.query,
+            data_version=data_version,
+        )
+
+    async def get_cached_response(self, request: web.Request,
+                                    sheets_list: list=[]) -> web.Response:
+        """Формирование ответа с вложением excel-книги через кэш отчетов.
+
+        Если клиент уже получил эту книгу (If-None-Match), возвращается
+        ответ 304 без тела, если книга есть в кэше - она не формируется.
+
+        Args:
+            request (Request): Запрос библиотеки aiohttp.
+            sheets_list (list, optional): Список таблиц.
+
+        Returns:
+            Response: Сформированный ответ библиотеки aiohttp
+                с вложенной excel-книгой.
+
+        """
+        if sheets_list:
+            self.sheets_list = sheets_list
+
+        data_version = await self.get_data_version()
+        if data_version is None:
+            await self.generate_data()
+            return await self.get_response_async()
+
+        key = self.get_cache_key(data_version)
+        etag = self.CACHE.get_etag(key)
+        if self.CACHE.match_etag(etag, request.headers.get('If-None-Match')):
+            return web.Response(status=304, headers={'ETag': etag})
+
+        loop = asyncio.get_event_loop()
+        cached = await loop.run_in_executor(None, self.CACHE.get, key)
+        if cached is not None:
+            logger.debug(f'Report cache hit: {key}')
+            self._set_excel(*cached)
+            return self._get_response(etag)
+
+        await self.generate_data()
+        response = await self.get_response_async()
+        response.headers['ETag'] = etag
+
+        try:
+            await loop.run_in_executor(
+                None, self.CACHE.put, key, self.fn, self.fd.getvalue())
+        except OSError as err:
+            logger.error(f'Error: Report cache is not saved: {err}')
+
+        return response
+
+    ######################## Исходные данные ########################
+    def _convert_timestamps(self, obj_list: RowStore) -> RowStore:
+        """Приведение столбцов TIMESTAMP_COLUMNS к датам excel.
+
+        Столбцы приводятся в копии хранилища: исходные данные (obj_list)
+        общие для таблиц отчета, и остальные таблицы получают их
+        без приведения.
+        """
+        keys = [key for key in self.TIMESTAMP_COLUMNS if key in obj_list.index]
+        if not keys:
+            return obj_list
+
+        obj_list = obj_list.copy()
+        for key in keys:
+            obj_list.convert(key, self.MSC_EXCEL_DATES)
+        return obj_list
+
+    def _convert_batch(self, obj_list: list):
+        """Приведение столбцов TIMESTAMP_COLUMNS пакета строк
+        к датам excel.
+        """
+        if not self.TIMESTAMP_COLUMNS:
+            return obj_list
+
+        store = RowStore()
+        store.extend(obj_list)
+        return self._convert_timestamps(store)
+
+    ####################### Дневные разделы отчета #######################
+    def get_period(self) -> tuple:
+        """Период отчета по параметрам запроса.
+
+        Отчет с периодом формируется из дневных разделов по столбцу
+        PARTITION_COLUMN, поэтому self.query не должен ограничивать
+        период: иначе разделы не переиспользуются другими периодами.
+
+        Returns:
+            tuple or None: Даты начала и окончания периода (включительно)
+                или None - отчет не разбивается на дневные разделы.
+
+        """
+        return None
+
+    def _get_partition_period(self) -> tuple:
+        if self.PARTITION_COLUMN is None:
+            return None
+        return self.get_period()
+
+    async def get_day_version(self, day: date, data_version):
+        """Версия исходных данных закрытого дня (входит в ключ раздела).
+
+        По умолчанию - версия данных отчета (get_data_version).
+        Переопределяется, если известно время изменения данных дня:
+        тогда изменение текущего дня не сбрасывает разделы прежних.
+
+        Args:
+            day (date): День раздела.
+            data_version (any): Версия данных отчета.
+
+        Returns:
+            any: Версия данных дня (None - раздел дня не кэшируется).
+
+        """
+        return data_version
+
+    def _get_day_query(self, day: date):
+        """Запрос данных отчета за день (по московскому времени)."""
+        start = self.MSC_TIMEZONE.localize(datetime.combine(day, time()))
+        end = self.MSC_TIMEZONE.localize(
+            datetime.combine(day + timedelta(days=1), time()))
+        column = sql.column(self.PARTITION_COLUMN)
+        return self.query.where(column >= start).where(column < end)
+
+    async def _generate_report_partitioned(self, sheet_key: str,
+                                            date_from: date, date_to: date):
+        """Формирование данных отчета за период из дневных разделов.
+
+        Разделы закрытых дней (до текущего дня) берутся из кэша
+        PARTITIONS, а при его отсутствии сортируются внешней сортировкой
+        и сохраняются потоком. Ключ раздела учитывает версию данных дня
+        (get_day_version) и версии справочников PARTITION_REFS.
+        Текущий день и дни без версии данных (None) формируются всегда:
+        без версии нельзя узнать, что раздел устарел.
+        Разделы сливаются внешней сортировкой по ключу SORT: одновременно
+        открыто не более ExternalSorter.max_runs файлов.
+
+        Returns:
+            list or iterator: Отсортированные словари данных строк таблицы.
+
+        """
+        logger.debug(f'Start generate partitions {date_from} - {date_to}: '
+                    f'{datetime.now().strftime("%H:%M:%S")}')
+
+        await self.get_refs(*self.PARTITION_REFS)
+        params = dict(
+            violation_form=self.violation_form,
+            sheet_key=sheet_key,
+            time_column=self.time_column,
+            query=self.query,
+            version=self.PARTITION_VERSION,
+            refs={name: self.get_ref_version(name)
+                    for name in self.PARTITION_REFS},
+        )
+        data_version = await self.get_data_version()
+        today = datetime.now(self.MSC_TIMEZONE).date()
+        loop = asyncio.get_event_loop()
+
+        sorter = self._get_sorter(sheet_key)
+        days = cached = 0
+        day = date_from
+        try:
+            while day <= date_to:
+                part = None
+                day_version = (await self.get_day_version(day, data_version)
+                                if day < today else None)
+                if day_version is not None:
+                    key = self.PARTITIONS.fingerprint(
+                        data_version=day_version, **params)
+                    part = await loop.run_in_executor(
+                        None, self.PARTITIONS.load, key, day)
+                    if part is None:
+                        await self._save_partition(sheet_key, key, day)
+                        part = await loop.run_in_executor(
+                            None, self.PARTITIONS.load, key, day)
+                    else:
+                        cached += 1
+
+                if part is None:
+                    # Текущий день, день без версии данных (или раздел,
+                    # вытесненный из кэша сразу)
+                    sorter.extend(
+                        await self._generate_day_rows(sheet_key, day))
+                else:
+                    sorter.add_run(part)
+
+                days += 1
+                day += timedelta(days=1)
+        except BaseException:
+            # Удаляем выгруженные серии: при успехе они читаются
+            # слиянием, возвращаемым sorted()
+            sorter.close()
+            raise
+
+        logger.debug(f'Partitions are ready ({cached} of {days} cached): '
+                    f'{datetime.now().strftime("%H:%M:%S")}')
+
+        return sorter.sorted()
+
+    async def _generate_day_rows(self, sheet_key: str, day: date):
+        """Словари данных строк таблицы за день (без сортировки)."""
+        obj_list = self._convert_timestamps(
+            await self._fetch_obj(self._get_day_query(day)))
+        return (self._generate_report_row(o, sheet_key) for o in obj_list)
+
+    async def _save_partition(self, sheet_key: str, key: str, day: date):
+        """Формирование и сохранение раздела закрытого дня."""
+        sorter = self._get_sorter(sheet_key)
+        try:
+            sorter.extend(await self._generate_day_rows(sheet_key, day))
+            await asyncio.get_event_loop().run_in_executor(
+                None, self.PARTITIONS.save, key, day, sorter.sorted())
+        finally:
+            sorter.close()
+
     #################### Генераторы списков данных ######################
-    async def _generate_report(self, sheet_key: str) -> list:
-        # Объявляем результирующий список отчётных данных
-        # для формирования списка объектов:
-        data_list = []
+    def _generate_report_row(self, o, sheet_key: str) -> dict:
+        """Формирование словаря данных строки отчета.
 
+        Args:
+            o (RowProxy): Строка исходных данных.
+            sheet_key (str): Ключ таблицы отчета.
+
+        Returns:
+            dict: Словарь данных строки таблицы.
+
+        """
         # Параметры:
         # Московская временная зона для приведения времени
-        msc_timezone = timezone('Europe/Moscow')
+        msc_timezone = self.MSC_TIMEZONE
         # Разделитель многострочного параметра
         delimiter = ExcelGenerator.DELIMITER
         # Нулевой символ (заполнитель пустого значения)
         null_symb = ExcelGenerator.NULL_SYMB
 
+        ################## Формируем словарь данных ##################
+        d = {}
+
+        """Определяем порядок заполнения словаря, например:
+        # Языки, используемые в тексте материала
+        try:
+            d[self.LANGUAGES] = self.join_refs('languages',
+                                                s[self.DB_LANGUAGES])
+        except KeyError as err:
+            raise ValidError.obj_data_not_exist('Объект', s[self.DB_ID],
+                                            'Язык', self.DB_LANGUAGES, err)
+
+        # Дата создания (столбец DB_CREATION_TS входит в
+        # TIMESTAMP_COLUMNS и уже приведен к числовому формату дат excel)
+        d[self.CREATED_AT] = o[self.DB_CREATION_TS]
+
+        """
+
+        return d
+
+    def _set_report_styles(self):
+        # Если установлен признак времени,
+        # меняем формат поля даты (только для этого генератора):
+        excel_sheet = type(self).EXCEL_SHEET
+        self.EXCEL_SHEET = excel_sheet.with_styles(
+            excel_sheet.STYLES_DATETIME if self.time_column
+            else excel_sheet.STYLES)
+
+    def _get_report_query(self, sheet_key: str):
+        """Запрос данных таблицы отчета с сортировкой в БД (SORT_SPECS)."""
+        order_by = self._get_order_by(sheet_key)
+        return self.query.order_by(*order_by) if order_by else self.query
+
+    async def _generate_report(self, sheet_key: str):
+        period = self._get_partition_period()
+        if period is not None:
+            self._set_report_styles()
+            return await self._generate_report_partitioned(sheet_key, *period)
+
         ####################### Получаем данные #######################
         # Получаем списки идентификаторов
         logger.debug(
             f'Start generate data: {datetime.now().strftime("%H:%M:%S")}')
 
         # Получаем список данных
-        await self.get_obj()
+        query = self._get_report_query(sheet_key)
+        await self.get_obj(to_dict=False, query=query)
         logger.debug(f'Obj done: {datetime.now().strftime("%H:%M:%S")}')
         # Получаем оставшиеся данные
         # ...
 
         ################## Формируем список данных ##################
-        for o in self.obj_list:
-            ################## Формируем словарь данных ##################
-            d = {}
+        obj_list = self._convert_timestamps(self.obj_list)
+        rows = (
+            self._generate_report_row(o, sheet_key) for o in obj_list
+        )
 
-            """Определяем порядок заполнения словаря, например:
-            # Языки, используемые в тексте материала
-            try:
-                languages = s[self.DB_LANGUAGES]
-                d[self.LANGUAGES] = (
-                    delimiter.join([
-                        self.languages[v] for v in languages
-                    ])
-                    if languages else null_symb
-                )
-            except KeyError as err:
-                raise ValidError.obj_data_not_exist('Объект', s[self.DB_ID],
-                                                'Язык', self.DB_LANGUAGES, err)
+        self._set_report_styles()
 
-            # Дата создания
-            d[self.CREATED_AT] = datetime.fromtimestamp(
-                d[self.CREATION_TS], msc_timezone)
+        if self.SORT_SPECS.get(sheet_key) and self._is_obj_query(query):
+            # Данные отсортированы в БД
+            data_list = list(rows)
+        else:
+            # Сортируем данные (не уместившиеся в памяти - на диске):
+            sorter = self._get_sorter(sheet_key)
+            sorter.extend(rows)
+            data_list = sorter.sorted()
+        logger.debug(f'Report data count={len(self.obj_list)} is ready: '
+                    f'{datetime.now().strftime("%H:%M:%S")}')
 
-            """
+        return data_list
 
-            data_list.append(d)
+    def _is_obj_query(self, query) -> bool:
+        """Исходные данные получены запросом query.
 
-        # Если установлен признак времени,
-        # меняем формат поля даты:
-        if self.time_column:
-            self.EXCEL_SHEET.STYLES = ExcelSheetStyle.STYLES(
-                self.EXCEL_SHEET.HEADER_STYLE,
-                self.EXCEL_SHEET.HEADER_SLIM_STYLE,
-                self.EXCEL_SHEET.CELL_STYLE,
-                self.EXCEL_SHEET.CELL_BIG_STYLE,
-                self.EXCEL_SHEET.CELL_PERCENT_STYLE,
-                self.EXCEL_SHEET.CELL_DATETIME_STYLE
-            )
-        else:
-            self.EXCEL_SHEET.STYLES = ExcelSheet.STYLES
+        Данные, уже полученные другой таблицей (get_obj), могут быть
+        получены без сортировки этой таблицы в БД.
+        """
+        return (self.obj_query is query
+                or self.CACHE.fingerprint(query=self.obj_query)
+                    == self.CACHE.fingerprint(query=query))
+
+    def _get_sorter(self, sheet_key: str) -> ExternalSorter:
+        """Внешняя сортировка данных таблицы по ключу SORT."""
+        return ExternalSorter(self.SORT[sheet_key], self.SORT_MAX_ROWS)
+
+    async def _iter_report(self, sheet_key: str):
+        """Пакетное формирование данных отчета по мере чтения из БД.
+
+        Если таблица сортируется в БД (SORT_SPECS), пакеты передаются
+        по мере чтения. Иначе строки сортируются внешней сортировкой
+        по ключу SORT и передаются после чтения всех данных.
+
+        Yields:
+            list of dict: Пакет словарей данных строк таблицы.
+
+        """
+        logger.debug(
+            f'Start stream data: {datetime.now().strftime("%H:%M:%S")}')
+
+        sorter = (None if self.SORT_SPECS.get(sheet_key)
+                    else self._get_sorter(sheet_key))
+        count = 0
+        async for obj_list in self.iter_obj(self._get_report_query(sheet_key)):
+            obj_list = self._convert_batch(obj_list)
+            count += len(obj_list)
+            rows = [self._generate_report_row(o, sheet_key) for o in obj_list]
+            if sorter is None:
+                yield rows
+            else:
+                sorter.extend(rows)
+
+        if sorter is not None:
+            rows = iter(sorter.sorted())
+            batch = list(islice(rows, self.FETCH_SIZE))
+            while batch:
+                yield batch
+                batch = list(islice(rows, self.FETCH_SIZE))
 
-        # Сортируем данные:
-        data_list = sorted(data_list, key=self.SORT[sheet_key])
-        logger.debug(f'Report data count={len(data_list)} is ready: '
+        logger.debug(f'Report data count={count} is streamed: '
                     f'{datetime.now().strftime("%H:%M:%S")}')
 
-        return data_list
+    async def _generate_sheet_data(self, sheet_key: str):
+        """Формирование данных таблицы отчета."""
+        if sheet_key in (self.REPORT_SHORT, self.REPORT_FULL):
+            if self.stream and self._get_partition_period() is None:
+                # Строки читаются из БД по мере записи таблицы
+                self._set_report_styles()
+                return self._iter_report(sheet_key)
+
+            return await self._generate_report(sheet_key)
+
+        elif sheet_key == self.STATISTIC_SOURCES:
+            return await self._generate_statistic_source()
+
+        elif sheet_key == self.STATISTIC_TIMINGS:
+            return await self._generate_statistic_timings()
+
+        else:
+            return await self._generate_statistic_data(sheet_key)
 
     async def generate_data(self, sheets_list: list=[]) -> dict:
+        """Формирование данных таблиц отчета.
+
+        Данные таблиц формируются одновременно (каждая таблица читает
+        данные через своё соединение пула), но не более
+        SHEETS_CONCURRENCY таблиц сразу. Таблицы, читаемые из БД
+        по мере записи, занимают место семафора на время чтения.
+        """
         if sheets_list:
             self.sheets_list = sheets_list
 
@@ -1015,19 +2746,28 @@ class ReportGenerator(BaseGenerator, ExcelGenerator, ReportBase):
                         + self.REPORTS.get(self.report_type, []))
         self.sheets_list = self._optimise_sheets_list(_sheets_list)
 
-        for sheet_key in self.sheets_list:
-            if sheet_key in (self.REPORT_SHORT, self.REPORT_FULL):
-                self._data[sheet_key] = await self._generate_report(sheet_key)
+        semaphore = asyncio.Semaphore(self.SHEETS_CONCURRENCY)
 
-            elif sheet_key == self.STATISTIC_SOURCES:
-                self._data[sheet_key] = await self._generate_statistic_source()
+        async def generate(sheet_key: str):
+            async with semaphore:
+                sheet_data = await self._generate_sheet_data(sheet_key)
+            if hasattr(sheet_data, '__aiter__'):
+                return _limit_batches(sheet_data, semaphore)
+            return sheet_data
 
-            elif sheet_key == self.STATISTIC_TIMINGS:
-                self._data[sheet_key] = await self._generate_statistic_timings()
+        tasks = [
+            asyncio.ensure_future(generate(sheet_key))
+            for sheet_key in self.sheets_list
+        ]
+        try:
+            sheets_data = await asyncio.gather(*tasks)
+        except BaseException:
+            # Не оставляем запросы остальных таблиц выполняться
+            for task in tasks:
+                task.cancel()
+            raise
 
-            else:
-                self._data[sheet_key] = await self._generate_statistic_data(
-                                                                    sheet_key)
+        self._data.update(zip(self.sheets_list, sheets_data))
 
         return self._data
 
@@ -1158,7 +2898,7 @@ class StatisticGenerator(BaseGenerator, Statistic):
         data = []
 
         # Получаем список данных
-        await self.get_obj()
+        await self.get_obj(to_dict=False)
         # Получаем список социальных сетей
         await self.get_social_nets()
 
@@ -1,4 +1,8 @@
 """Утилиты для генерации excel-таблиц с помощью xlsxwriter."""
+from copy import copy
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import (
     Alignment as PyxlAlignment,
     Border as PyxlBorder,
@@ -8,8 +12,10 @@ from openpyxl.styles import (
     Side as PyxlSide,
     NamedStyle as PyxlStyle,
 )
+from openpyxl.styles.cell_style import StyleArray
 from openpyxl.utils.exceptions import ReadOnlyWorkbookException
 from openpyxl.workbook import Workbook as PyxlWorkbook
+from openpyxl.writer.excel import ExcelWriter
 from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 from openpyxl.worksheet.worksheet import Worksheet as PyxlWorksheet
 
@@ -43,13 +49,91 @@ class Worksheet(PyxlWorksheet):
         if value is not None:
             cell.value = value
 
-        if style is not None:
+        if isinstance(style, StyleArray):
+            cell._style = copy(style)
+        elif style is not None:
             cell.style = style
 
         return cell
 
 
+class WriteOnlySheet(WriteOnlyWorksheet):
+    def cell(self, value=None, style: PyxlStyle = None) -> WriteOnlyCell:
+        """
+        Returns a detached cell object for the streaming write-only mode.
+
+        Usage: sheet.append([sheet.cell(5, style)])
+
+        The cell is not stored in the worksheet, it lives
+        only until the row it belongs to is appended.
+
+        :param value: value of the cell (e.g. 5)
+        :type value: numeric or time or string or bool or none
+
+        :param style: named style, its name or its resolved style array
+        :type style: openpyxl.styles.NamedStyle or str or StyleArray
+
+        :rtype: openpyxl.cell.WriteOnlyCell
+        """
+        cell = WriteOnlyCell(self, value)
+
+        if isinstance(style, StyleArray):
+            cell._style = copy(style)
+        elif style is not None:
+            cell.style = style
+
+        return cell
+
+
+class Compression:
+    """Профили zip-сжатия excel-книги.
+
+    Профиль задает способ сжатия и уровень zlib частей пакета xlsx
+    (см. README - замеры времени сохранения и размера книги).
+    """
+    # Быстрое сжатие (zlib level 1)
+    FASTEST = 'fastest'
+    # Сбалансированное сжатие (zlib level 6, как у openpyxl)
+    BALANCED = 'balanced'
+    # Максимальное сжатие (zlib level 9)
+    SMALLEST = 'smallest'
+    # Без сжатия
+    STORED = 'stored'
+    DEFAULT = BALANCED
+
+    # Параметры ZipFile: (compression, compresslevel)
+    ALL = {
+        FASTEST: (ZIP_DEFLATED, 1),
+        BALANCED: (ZIP_DEFLATED, 6),
+        SMALLEST: (ZIP_DEFLATED, 9),
+        STORED: (ZIP_STORED, None),
+    }
+
+    @classmethod
+    def open(cls, filename, profile: str = DEFAULT) -> ZipFile:
+        """Создание пакета книги для записи с заданным профилем сжатия.
+
+        Args:
+            filename (str or file-like): Путь к файлу или
+                файловый дискриптор для сохранения книги.
+            profile (str, optional): Профиль сжатия
+                (по умолчанию - DEFAULT).
+
+        Returns:
+            ZipFile: Пакет книги, открытый на запись.
+
+        """
+        compression, compresslevel = cls.ALL[profile or cls.DEFAULT]
+        return ZipFile(filename, 'w', compression, allowZip64=True,
+                                                compresslevel=compresslevel)
+
+
 class Workbook(PyxlWorkbook):
+    def __init__(self, write_only=False, iso_dates=False,
+                    compression: str = Compression.DEFAULT):
+        super().__init__(write_only=write_only, iso_dates=iso_dates)
+        self.compression = compression
+
     def create_sheet(self, title=None, index=None):
         """Create a worksheet (at an optional index).
 
@@ -65,13 +149,68 @@ class Workbook(PyxlWorkbook):
             )
 
         if self.write_only:
-            new_ws = WriteOnlyWorksheet(parent=self, title=title)
+            new_ws = WriteOnlySheet(parent=self, title=title)
         else:
             new_ws = Worksheet(parent=self, title=title)
 
         self._add_sheet(sheet=new_ws, index=index)
         return new_ws
 
+    def save(self, filename):
+        """Save the current workbook under the given `filename`
+        with the workbook compression profile.
+
+        Use this function instead of using an `ExcelWriter`.
+
+        .. warning::
+            When creating your workbook using `write_only` set to True,
+            you will only be able to call this function once. Subsequents attempts to
+            modify or save the file will raise an :class:`openpyxl.shared.exc.WorkbookAlreadySaved` exception.
+        """
+        if self.read_only:
+            raise TypeError("""Workbook is read-only""")
+        if self.write_only and not self.worksheets:
+            self.create_sheet()
+
+        archive = Compression.open(filename, self.compression)
+        writer = ExcelWriter(self, archive)
+        writer.save()
+
+    def add_named_styles(self, styles) -> dict:
+        """Add named styles in one step.
+
+        Styles that are already registered are skipped.
+
+        :param styles: named styles to register
+        :type styles: iterable of openpyxl.styles.NamedStyle
+
+        :return: style arrays of all registered styles by style name,
+            ready to be assigned to cells without a name lookup
+        :rtype: dict
+        """
+        names = set(self._named_styles.names)
+
+        for style in styles:
+            if style.name not in names:
+                # A copy is bound to the workbook, so that shared styles
+                # do not keep a reference to it
+                self.add_named_style(PyxlStyle(
+                    name=style.name,
+                    font=style.font,
+                    fill=style.fill,
+                    border=style.border,
+                    alignment=style.alignment,
+                    number_format=style.number_format,
+                    protection=style.protection,
+                    builtinId=style.builtinId,
+                    hidden=style.hidden,
+                ))
+                names.add(style.name)
+
+        return {
+            style.name: copy(style.as_tuple()) for style in self._named_styles
+        }
+
 
 class Style:
     """Класс стилей excel-таблицы.
@@ -138,6 +277,8 @@ class Style:
         NUMBER_COMMA_SEPARATED_00   = '#,##0.00'
         PERCENTAGE                  = '0%'
         PERCENTAGE_00               = '0.00%'
+        DATE                        = 'dd.mm.yyyy'
+        DATETIME                    = 'dd.mm.yyyy hh:mm'
         DATE_YYYYMMDD2              = 'yyyy-mm-dd'
         DATE_YYMMDD                 = 'yy-mm-dd'
         DATE_DDMMYY                 = 'dd/mm/yy'
@@ -1,4 +1,8 @@
 """Утилиты для генерации excel-таблиц."""
+from collections import OrderedDict
+from copy import copy
+from threading import Lock
+
 from xlwt import (
     XFStyle,
     Font,
@@ -116,6 +120,11 @@ class Style2003:
     FONT_WIDTH_INC = 25.6
     # Цвет границ ячейки по умолчанию
     DEFAULT_BORDER_COLOR = Color.DARK_GRAY
+    # Максимальное число стилей в кэше
+    STYLES_CACHE_SIZE = 1024
+    # Кэш созданных стилей {ключ стиля: XFStyle} с вытеснением LRU
+    _styles = OrderedDict()
+    _styles_lock = Lock()
 
     def __init__(
         self,
@@ -321,19 +330,55 @@ class Style2003:
 
         return new_pattern
 
+    def get_key(self) -> tuple:
+        """Ключ стиля ячейки по значениям его параметров.
+
+        Returns:
+            tuple:  Ключ стиля (совпадает у стилей с равными параметрами).
+        """
+        return (
+            self.font._search_key(),
+            self.alignment._search_key(),
+            self.borders._search_key(),
+            self.pattern._search_key(),
+            self.protection._search_key(),
+            self.num_format_str,
+        )
+
     def get_style(self) -> XFStyle:
-        """Создает новый объект стиля ячейки с заданными в классе параметрами.
+        """Возвращает объект стиля ячейки с заданными в классе параметрами.
+
+        Стили с равными параметрами создаются однажды и разделяются
+        (кэш _styles), поэтому xlwt находит запись XF стиля по
+        идентичности объекта, не сравнивая его параметры.
+        Возвращённый стиль изменять нельзя. Стиль хранит копии
+        параметров: переданные в класс объекты можно изменять.
+        Кэш ограничен STYLES_CACHE_SIZE давно не запрашиваемыми стилями.
 
         Returns:
             XFStyle:  Объект 'Стиль' библиотеки xlwt.
         """
+        key = self.get_key()
+        with self._styles_lock:
+            style = self._styles.get(key)
+            if style is not None:
+                self._styles.move_to_end(key)
+                return style
+
         new_style                   = XFStyle()
 
-        new_style.alignment         = self.alignment
-        new_style.borders           = self.borders
-        new_style.font              = self.font
-        new_style.pattern           = self.pattern
-        new_style.protection        = self.protection
+        new_style.alignment         = copy(self.alignment)
+        new_style.borders           = copy(self.borders)
+        new_style.font              = copy(self.font)
+        new_style.pattern           = copy(self.pattern)
+        new_style.protection        = copy(self.protection)
         new_style.num_format_str    = self.num_format_str
 
+        with self._styles_lock:
+            # Стиль мог быть создан в другом потоке
+            new_style = self._styles.setdefault(key, new_style)
+            self._styles.move_to_end(key)
+            if len(self._styles) > self.STYLES_CACHE_SIZE:
+                self._styles.popitem(last=False)
+
         return new_style
@@ -0,0 +1,576 @@
+"""Легковесная запись excel-книг (SpreadsheetML) без объектов openpyxl.
+
+Строки таблиц записываются сразу в XML-разметку во временный файл,
+стили книги собираются в styles.xml из именованных стилей openpyxl.
+"""
+import os
+from datetime import date, datetime, time, timedelta
+from math import inf
+from numbers import Number
+from shutil import copyfileobj
+from tempfile import TemporaryFile
+from xml.sax.saxutils import escape, quoteattr
+from zipfile import ZipFile
+
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import (
+    Alignment as PyxlAlignment,
+    Border as PyxlBorder,
+    PatternFill as PyxlPattern,
+    Protection as PyxlProtection,
+    NamedStyle as PyxlStyle,
+)
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.styles.numbers import (
+    BUILTIN_FORMATS_MAX_SIZE,
+    BUILTIN_FORMATS_REVERSE,
+)
+from openpyxl.utils import get_column_letter
+from openpyxl.xml.functions import tostring
+
+from .excel_utils import Compression
+
+
+class SpreadsheetML:
+    """Пространства имен и типы содержимого пакета xlsx."""
+    XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+    NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    NS_REL = ('http://schemas.openxmlformats.org/officeDocument/2006/'
+                                                            'relationships')
+    NS_PACKAGE_REL = ('http://schemas.openxmlformats.org/package/2006/'
+                                                            'relationships')
+    NS_CONTENT_TYPES = ('http://schemas.openxmlformats.org/package/2006/'
+                                                            'content-types')
+
+    REL_DOCUMENT = f'{NS_REL}/officeDocument'
+    REL_WORKSHEET = f'{NS_REL}/worksheet'
+    REL_STYLES = f'{NS_REL}/styles'
+    REL_SHARED_STRINGS = f'{NS_REL}/sharedStrings'
+
+    _CT = 'application/vnd.openxmlformats-officedocument.spreadsheetml'
+    CT_WORKBOOK = f'{_CT}.sheet.main+xml'
+    CT_WORKSHEET = f'{_CT}.worksheet+xml'
+    CT_STYLES = f'{_CT}.styles+xml'
+    CT_SHARED_STRINGS = f'{_CT}.sharedStrings+xml'
+    CT_RELS = 'application/vnd.openxmlformats-package.relationships+xml'
+
+
+class XlsxStyles:
+    """Таблица стилей книги (styles.xml).
+
+    Каждый добавленный именованный стиль openpyxl превращается
+    в именованный стиль книги (cellStyleXfs и cellStyles) и в запись
+    cellXfs, которая на него ссылается и индекс которой указывается
+    в ячейках: как и в книге openpyxl, ячейки сохраняют имя стиля.
+    """
+    def __init__(self):
+        self._fonts = [DEFAULT_FONT]
+        self._fills = [
+            PyxlPattern(), PyxlPattern(fill_type='gray125'),
+        ]
+        self._borders = [PyxlBorder()]
+        # Пользовательские форматы чисел {формат: идентификатор}
+        self._num_formats = {}
+        # Записи cellStyleXfs и cellStyles именованных стилей
+        self._style_xfs = [
+            '<xf numFmtId="0" fontId="0" fillId="0" borderId="0"/>']
+        self._cell_styles = [
+            '<cellStyle name="Normal" xfId="0" builtinId="0"/>']
+        # Записи cellXfs
+        self._xfs = ['<xf numFmtId="0" fontId="0" fillId="0" borderId="0" '
+                        'xfId="0"/>']
+        # Индексы стилей {имя стиля: индекс cellXfs}
+        self.names = {}
+
+    @staticmethod
+    def _index(values: list, value) -> int:
+        try:
+            return values.index(value)
+        except ValueError:
+            values.append(value)
+            return len(values) - 1
+
+    def _get_num_format_id(self, num_format: str) -> int:
+        try:
+            return BUILTIN_FORMATS_REVERSE[num_format]
+        except KeyError:
+            return self._num_formats.setdefault(
+                num_format, BUILTIN_FORMATS_MAX_SIZE + len(self._num_formats))
+
+    def add(self, style: PyxlStyle) -> int:
+        """Добавление именованного стиля.
+
+        Args:
+            style (PyxlStyle): Именованный стиль openpyxl.
+
+        Returns:
+            int: Индекс стиля в cellXfs.
+
+        """
+        try:
+            return self.names[style.name]
+        except KeyError:
+            pass
+
+        ids = (
+            f'numFmtId="{self._get_num_format_id(style.number_format)}" '
+            f'fontId="{self._index(self._fonts, style.font)}" '
+            f'fillId="{self._index(self._fills, style.fill)}" '
+            f'borderId="{self._index(self._borders, style.border)}"'
+        )
+        apply = ('applyNumberFormat="1" applyFont="1" applyFill="1" '
+                    'applyBorder="1" applyAlignment="1" applyProtection="1"')
+        children = (
+            self._tostring(style.alignment or PyxlAlignment())
+            + self._tostring(style.protection or PyxlProtection())
+        )
+
+        # Именованный стиль книги
+        self._style_xfs.append(f'<xf {ids} {apply}>{children}</xf>')
+        xf_id = len(self._style_xfs) - 1
+        builtin_id = ('' if style.builtinId is None
+                        else f' builtinId="{style.builtinId}"')
+        self._cell_styles.append(
+            f'<cellStyle name={quoteattr(style.name)} xfId="{xf_id}"'
+            f'{builtin_id}/>')
+
+        # Формат ячеек со ссылкой на именованный стиль
+        self._xfs.append(f'<xf {ids} xfId="{xf_id}" {apply}>{children}</xf>')
+        self.names[style.name] = len(self._xfs) - 1
+        return self.names[style.name]
+
+    @staticmethod
+    def _tostring(obj) -> str:
+        return tostring(obj.to_tree()).decode()
+
+    def to_xml(self) -> str:
+        num_formats = ''.join(
+            f'<numFmt numFmtId="{fmt_id}" formatCode={quoteattr(fmt)}/>'
+            for fmt, fmt_id in self._num_formats.items()
+        )
+        if num_formats:
+            num_formats = (f'<numFmts count="{len(self._num_formats)}">'
+                            f'{num_formats}</numFmts>')
+
+        return (
+            f'{SpreadsheetML.XML_HEADER}'
+            f'<styleSheet xmlns="{SpreadsheetML.NS_MAIN}">'
+            f'{num_formats}'
+            f'<fonts count="{len(self._fonts)}">'
+            f'{"".join(self._tostring(v) for v in self._fonts)}</fonts>'
+            f'<fills count="{len(self._fills)}">'
+            f'{"".join(self._tostring(v) for v in self._fills)}</fills>'
+            f'<borders count="{len(self._borders)}">'
+            f'{"".join(self._tostring(v) for v in self._borders)}</borders>'
+            f'<cellStyleXfs count="{len(self._style_xfs)}">'
+            f'{"".join(self._style_xfs)}</cellStyleXfs>'
+            f'<cellXfs count="{len(self._xfs)}">{"".join(self._xfs)}'
+            '</cellXfs>'
+            f'<cellStyles count="{len(self._cell_styles)}">'
+            f'{"".join(self._cell_styles)}</cellStyles>'
+            '</styleSheet>'
+        )
+
+
+class XlsxSharedStrings:
+    """Таблица общих строк книги (sharedStrings.xml).
+
+    Каждое уникальное значение хранится один раз, а ячейки ссылаются
+    на него по индексу.
+    """
+    def __init__(self):
+        # Индексы строк {строка: индекс}
+        self._strings = {}
+        # Общее число ссылок на строки
+        self.count = 0
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def add(self, value: str) -> int:
+        self.count += 1
+        try:
+            return self._strings[value]
+        except KeyError:
+            index = self._strings[value] = len(self._strings)
+            return index
+
+    def write(self, archive: ZipFile, name: str):
+        """Запись таблицы общих строк в пакет xlsx.
+
+        Args:
+            archive (ZipFile): Пакет книги.
+            name (str): Имя части пакета.
+
+        """
+        with archive.open(name, 'w') as part:
+            part.write((
+                f'{SpreadsheetML.XML_HEADER}'
+                f'<sst xmlns="{SpreadsheetML.NS_MAIN}" count="{self.count}" '
+                f'uniqueCount="{len(self._strings)}">'
+            ).encode())
+            for value in self._strings:
+                value = escape(ILLEGAL_CHARACTERS_RE.sub('', value))
+                part.write(
+                    f'<si><t xml:space="preserve">{value}</t></si>'.encode())
+            part.write(b'</sst>')
+
+
+class XlsxColumn:
+    __slots__ = ('width', )
+
+    def __init__(self):
+        self.width = None
+
+
+class XlsxColumns(dict):
+    """Параметры столбцов таблицы {буква столбца: XlsxColumn}."""
+    def __missing__(self, key: str) -> XlsxColumn:
+        column = self[key] = XlsxColumn()
+        return column
+
+
+class XlsxWorksheet:
+    """Таблица книги, строки которой сразу записываются в XML.
+
+    Разметка строк копится во временном файле, поэтому потребление
+    памяти не зависит от числа строк.
+
+    Args:
+        title (str): Наименование таблицы.
+        shared_strings (XlsxSharedStrings): Таблица общих строк книги
+            (None - все строки записываются в ячейки напрямую).
+        file (file-like, optional): Бинарный файл для разметки строк
+            (по умолчанию - временный файл).
+
+    """
+    # Начало отсчета дат excel (с учетом ошибки 1900 года)
+    EPOCH = datetime(1899, 12, 30)
+    EPOCH_DATE = EPOCH.date()
+    SECONDS_PER_DAY = 86400
+
+    def __init__(self, title: str, shared_strings: 'XlsxSharedStrings',
+                    file=None):
+        self.title = title
+        self.column_dimensions = XlsxColumns()
+        self._shared_strings = shared_strings
+        self._shared = ()
+        self._file = file or TemporaryFile()
+        self._row = 0
+        self._letters = []
+
+    @property
+    def max_row(self) -> int:
+        return self._row
+
+    @property
+    def shared_strings(self) -> tuple:
+        return self._shared
+
+    @shared_strings.setter
+    def shared_strings(self, value):
+        """Признаки записи строк столбцов через таблицу общих строк.
+
+        Для столбцов с повторяющимися значениями (источники, статусы,
+        регионы) общие строки уменьшают размер книги, а уникальный
+        текст выгоднее записывать в ячейку напрямую (inlineStr).
+        Столбцы без признака используют таблицу общих строк.
+        """
+        self._shared = tuple(value)
+
+    def _get_shared(self, count: int) -> tuple:
+        if self._shared_strings is None:
+            self._shared = (False, ) * count
+        elif len(self._shared) < count:
+            self._shared += (True, ) * (count - len(self._shared))
+        return self._shared
+
+    def _get_letters(self, count: int) -> list:
+        for cn in range(len(self._letters) + 1, count + 1):
+            self._letters.append(get_column_letter(cn))
+        return self._letters
+
+    @classmethod
+    def to_excel(cls, value) -> float:
+        """Приведение даты и времени к числовому формату excel."""
+        if isinstance(value, datetime):
+            return (
+                (value.replace(tzinfo=None) - cls.EPOCH).total_seconds()
+                / cls.SECONDS_PER_DAY
+            )
+        elif isinstance(value, date):
+            return (value - cls.EPOCH_DATE).days
+        elif isinstance(value, time):
+            return (
+                (value.hour * 60 + value.minute) * 60 + value.second
+                + value.microsecond / 1e6
+            ) / cls.SECONDS_PER_DAY
+        else:
+            return value.total_seconds() / cls.SECONDS_PER_DAY
+
+    def _cell(self, ref: str, value, xf: int, shared: bool) -> str:
+        if value is None:
+            return f'<c r="{ref}" s="{xf}"/>'
+
+        if isinstance(value, str):
+            if shared:
+                return (f'<c r="{ref}" s="{xf}" t="s">'
+                        f'<v>{self._shared_strings.add(value)}</v></c>')
+
+            value = escape(ILLEGAL_CHARACTERS_RE.sub('', value))
+            return (f'<c r="{ref}" s="{xf}" t="inlineStr"><is>'
+                    f'<t xml:space="preserve">{value}</t></is></c>')
+        elif isinstance(value, bool):
+            return f'<c r="{ref}" s="{xf}" t="b"><v>{int(value)}</v></c>'
+        elif isinstance(value, Number):
+            # NaN и бесконечность - ошибка #NUM! (как в Excel)
+            if value != value or value in (inf, -inf):
+                return f'<c r="{ref}" s="{xf}" t="e"><v>#NUM!</v></c>'
+            return f'<c r="{ref}" s="{xf}"><v>{value}</v></c>'
+        elif isinstance(value, (date, time, timedelta)):
+            return (f'<c r="{ref}" s="{xf}">'
+                    f'<v>{self.to_excel(value)!r}</v></c>')
+        else:
+            return self._cell(ref, str(value), xf, shared)
+
+    def append(self, row: list, styles: dict):
+        """Запись строки таблицы.
+
+        Args:
+            row (list of tuple): Строка таблицы в виде пар
+                (значение ячейки, имя стиля ячейки).
+            styles (dict): Индексы стилей книги {имя стиля: индекс}.
+
+        """
+        self._row += 1
+        rn = self._row
+        letters = self._get_letters(len(row))
+        shared = self._get_shared(len(row))
+        cell = self._cell
+
+        self._file.write((
+            f'<row r="{rn}">'
+            + ''.join([
+                cell(f'{letters[cc]}{rn}', value, styles[style], shared[cc])
+                for cc, (value, style) in enumerate(row)
+            ])
+            + '</row>'
+        ).encode())
+
+    def write_rows(self, rows, styles: dict):
+        """Запись строк таблицы.
+
+        Args:
+            rows (iterable of list): Строки таблицы в виде пар
+                (значение ячейки, имя стиля ячейки).
+            styles (dict): Индексы стилей книги {имя стиля: индекс}.
+
+        """
+        append = self.append
+        for row in rows:
+            append(row, styles)
+
+    @staticmethod
+    def _column_index(letter: str) -> int:
+        cn = 0
+        for char in letter:
+            cn = cn * 26 + ord(char) - ord('A') + 1
+        return cn
+
+    def _get_cols(self) -> str:
+        columns = sorted(
+            (self._column_index(letter), column.width)
+            for letter, column in self.column_dimensions.items()
+            if column.width is not None
+        )
+        cols = ''.join(
+            f'<col min="{cn}" max="{cn}" width="{width}" customWidth="1"/>'
+            for cn, width in columns
+        )
+        return f'<cols>{cols}</cols>' if cols else ''
+
+    def save(self, archive: ZipFile, name: str):
+        """Запись таблицы в пакет xlsx.
+
+        Args:
+            archive (ZipFile): Пакет книги.
+            name (str): Имя части пакета.
+
+        """
+        self._file.seek(0)
+        with archive.open(name, 'w') as part:
+            part.write((
+                f'{SpreadsheetML.XML_HEADER}'
+                f'<worksheet xmlns="{SpreadsheetML.NS_MAIN}" '
+                f'xmlns:r="{SpreadsheetML.NS_REL}">'
+                f'{self._get_cols()}<sheetData>'
+            ).encode())
+            copyfileobj(self._file, part)
+            part.write(b'</sheetData></worksheet>')
+
+    def detach(self) -> tuple:
+        """Закрытие файла разметки строк для передачи в другой процесс.
+
+        Returns:
+            tuple: Путь к файлу разметки строк и число строк.
+
+        """
+        self._file.close()
+        return self._file.name, self._row
+
+    def attach(self, path: str, rows: int):
+        """Подключение разметки строк, сформированной в другом процессе.
+
+        Args:
+            path (str): Путь к файлу разметки строк (удаляется после
+                подключения).
+            rows (int): Число строк.
+
+        """
+        self._file.close()
+        self._file = open(path, 'rb')
+        os.unlink(path)
+        self._row = rows
+
+    def close(self):
+        self._file.close()
+
+
+class XlsxWorkbook:
+    """Excel-книга, записываемая напрямую в формате SpreadsheetML.
+
+    Повторяет используемую генератором часть интерфейса книги openpyxl
+    (create_sheet, add_named_styles, save), но не создает объектов
+    ячеек: строки таблиц сразу записываются в XML-разметку.
+
+    Args:
+        compression (str, optional): Профиль сжатия в соответствии
+            с Compression (по умолчанию - Compression.DEFAULT).
+
+    """
+    # Книга всегда записывается потоково
+    write_only = True
+
+    def __init__(self, compression: str = Compression.DEFAULT):
+        self.compression = compression
+        self._sheets = []
+        self._styles = XlsxStyles()
+        self._shared_strings = XlsxSharedStrings()
+
+    @property
+    def worksheets(self) -> list:
+        return list(self._sheets)
+
+    def create_sheet(self, title: str = None) -> XlsxWorksheet:
+        title = title or f'Sheet{len(self._sheets) + 1}'
+        sheet = XlsxWorksheet(title, self._shared_strings)
+        self._sheets.append(sheet)
+        return sheet
+
+    def add_named_styles(self, styles) -> dict:
+        """Добавление именованных стилей.
+
+        Args:
+            styles (iterable of PyxlStyle): Именованные стили openpyxl.
+
+        Returns:
+            dict: Индексы стилей книги {имя стиля: индекс}.
+
+        """
+        for style in styles:
+            self._styles.add(style)
+
+        return dict(self._styles.names)
+
+    def _get_workbook(self) -> str:
+        sheets = ''.join(
+            f'<sheet name={quoteattr(sh.title)} sheetId="{i}" r:id="rId{i}"/>'
+            for i, sh in enumerate(self._sheets, start=1)
+        )
+        return (
+            f'{SpreadsheetML.XML_HEADER}'
+            f'<workbook xmlns="{SpreadsheetML.NS_MAIN}" '
+            f'xmlns:r="{SpreadsheetML.NS_REL}">'
+            f'<sheets>{sheets}</sheets></workbook>'
+        )
+
+    def _get_workbook_rels(self) -> str:
+        rels = [
+            f'<Relationship Id="rId{i}" Type="{SpreadsheetML.REL_WORKSHEET}" '
+            f'Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, len(self._sheets) + 1)
+        ]
+        rels.append(
+            f'<Relationship Id="rId{len(self._sheets) + 1}" '
+            f'Type="{SpreadsheetML.REL_STYLES}" Target="styles.xml"/>'
+        )
+        if self._shared_strings:
+            rels.append(
+                f'<Relationship Id="rId{len(self._sheets) + 2}" '
+                f'Type="{SpreadsheetML.REL_SHARED_STRINGS}" '
+                'Target="sharedStrings.xml"/>'
+            )
+        return (
+            f'{SpreadsheetML.XML_HEADER}'
+            f'<Relationships xmlns="{SpreadsheetML.NS_PACKAGE_REL}">'
+            f'{"".join(rels)}</Relationships>'
+        )
+
+    def _get_rels(self) -> str:
+        return (
+            f'{SpreadsheetML.XML_HEADER}'
+            f'<Relationships xmlns="{SpreadsheetML.NS_PACKAGE_REL}">'
+            f'<Relationship Id="rId1" Type="{SpreadsheetML.REL_DOCUMENT}" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        )
+
+    def _get_content_types(self) -> str:
+        sheets = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            f'ContentType="{SpreadsheetML.CT_WORKSHEET}"/>'
+            for i in range(1, len(self._sheets) + 1)
+        )
+        if self._shared_strings:
+            sheets += ('<Override PartName="/xl/sharedStrings.xml" '
+                        f'ContentType="{SpreadsheetML.CT_SHARED_STRINGS}"/>')
+
+        return (
+            f'{SpreadsheetML.XML_HEADER}'
+            f'<Types xmlns="{SpreadsheetML.NS_CONTENT_TYPES}">'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            f'<Default Extension="rels" ContentType="{SpreadsheetML.CT_RELS}"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            f'ContentType="{SpreadsheetML.CT_WORKBOOK}"/>'
+            '<Override PartName="/xl/styles.xml" '
+            f'ContentType="{SpreadsheetML.CT_STYLES}"/>'
+            f'{sheets}</Types>'
+        )
+
+    def save(self, filename):
+        """Сохранение книги.
+
+        Args:
+            filename (str or file-like): Путь к файлу или
+                файловый дискриптор для сохранения книги.
+
+        """
+        if not self._sheets:
+            self.create_sheet()
+
+        with Compression.open(filename, self.compression) as archive:
+            archive.writestr('xl/styles.xml', self._styles.to_xml())
+
+            for i, sheet in enumerate(self._sheets, start=1):
+                sheet.save(archive, f'xl/worksheets/sheet{i}.xml')
+                sheet.close()
+
+            # Таблица общих строк заполнена только после записи таблиц
+            if self._shared_strings:
+                self._shared_strings.write(archive, 'xl/sharedStrings.xml')
+
+            archive.writestr('[Content_Types].xml', self._get_content_types())
+            archive.writestr('_rels/.rels', self._get_rels())
+            archive.writestr('xl/workbook.xml', self._get_workbook())
+            archive.writestr('xl/_rels/workbook.xml.rels',
+                                                    self._get_workbook_rels())
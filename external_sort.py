@@ -0,0 +1,150 @@
+"""Внешняя сортировка данных, не умещающихся в памяти."""
+import pickle
+from heapq import merge
+from itertools import islice
+from tempfile import TemporaryFile
+
+
+class ExternalSorter:
+    """Сортировка слиянием с выгрузкой отсортированных серий на диск.
+
+    Строки копятся в буфере; заполненный буфер (max_rows строк)
+    сортируется и выгружается во временный файл. Результат - ленивое
+    слияние серий с диска и остатка буфера (сортировка устойчива).
+    Одновременно сливается не более max_runs серий: при их накоплении
+    серии сливаются в одну на диске, поэтому число открытых файлов
+    ограничено.
+
+    Args:
+        key (callable): Функция ключа сортировки.
+        max_rows (int): Число строк в памяти, после которого
+            отсортированная серия выгружается на диск.
+        chunk_size (optional, int): Число строк в одной записи (pickle)
+            временного файла.
+        max_runs (optional, int): Максимальное число одновременно
+            сливаемых серий.
+
+    """
+    def __init__(self, key, max_rows: int, chunk_size: int=1000,
+                    max_runs: int=64):
+        if max_rows < 1:
+            raise ValueError(f'max_rows must be positive: {max_rows}')
+        if max_runs < 2:
+            raise ValueError(f'max_runs must be at least 2: {max_runs}')
+
+        self.key = key
+        self.max_rows = max_rows
+        self.chunk_size = chunk_size
+        self.max_runs = max_runs
+        self.__buffer = []
+        # Серии: итераторы отсортированных строк
+        self.__runs = []
+        # Временные файлы серий
+        self.__files = []
+        self.__count = 0
+
+    def __len__(self) -> int:
+        return self.__count
+
+    @property
+    def spilled(self) -> bool:
+        """Признак выгрузки серий на диск."""
+        return bool(self.__runs)
+
+    def add(self, row):
+        self.__buffer.append(row)
+        self.__count += 1
+        if len(self.__buffer) >= self.max_rows:
+            self._spill()
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def add_run(self, rows, count: int=0):
+        """Добавление уже отсортированной серии строк.
+
+        Серия читается лениво - при слиянии.
+
+        Args:
+            rows (iterable): Строки, отсортированные по key.
+            count (optional, int): Число строк серии.
+
+        """
+        self.__runs.append(iter(rows))
+        self.__count += count
+        if len(self.__runs) >= self.max_runs:
+            self._merge_runs()
+
+    def _write_run(self, rows):
+        """Запись отсортированных строк во временный файл серии."""
+        run = TemporaryFile()
+        self.__files.append(run)
+
+        rows = iter(rows)
+        chunk = list(islice(rows, self.chunk_size))
+        while chunk:
+            pickle.dump(chunk, run, pickle.HIGHEST_PROTOCOL)
+            chunk = list(islice(rows, self.chunk_size))
+        run.seek(0)
+
+        self.__runs.append(self._read_run(run))
+
+    def _spill(self):
+        """Выгрузка отсортированного буфера во временный файл."""
+        self.__buffer.sort(key=self.key)
+        buffer, self.__buffer = self.__buffer, []
+        self._write_run(buffer)
+        if len(self.__runs) >= self.max_runs:
+            self._merge_runs()
+
+    def _merge_runs(self):
+        """Слияние накопленных серий в одну серию на диске."""
+        runs, self.__runs = self.__runs, []
+        try:
+            self._write_run(merge(*runs, key=self.key))
+        finally:
+            for run in runs:
+                if hasattr(run, 'close'):
+                    run.close()
+            self.__files = [run for run in self.__files if not run.closed]
+
+    @staticmethod
+    def _read_run(run):
+        try:
+            while True:
+                yield from pickle.load(run)
+        except EOFError:
+            pass
+        finally:
+            run.close()
+
+    def sorted(self):
+        """Отсортированные строки.
+
+        Без серий возвращается отсортированный список,
+        иначе - итератор слияния серий (читается однократно).
+
+        Returns:
+            list or iterator: Отсортированные строки.
+
+        """
+        self.__buffer.sort(key=self.key)
+        buffer, self.__buffer = self.__buffer, []
+        if not self.__runs:
+            return buffer
+
+        runs, self.__runs = self.__runs, []
+        self.__files = []
+        return merge(*runs, buffer, key=self.key)
+
+    def close(self):
+        """Удаление временных файлов серий."""
+        for run in self.__runs:
+            if hasattr(run, 'close'):
+                run.close()
+        for run in self.__files:
+            run.close()
+        self.__runs = []
+        self.__files = []
+        self.__buffer = []
@@ -1,11 +1,18 @@
+from itertools import count
 from typing import List
 
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, sql, update, delete
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.expression import ClauseElement
 
 from .loggers import getLogger
 
 logger = getLogger()
 
+# Счетчик имен серверных курсоров
+_cursor_ids = count(1)
+
 
 async def get_object(conn, query, many=False):
     """Получение объекта(объектов) из БД.
@@ -26,6 +33,95 @@ async def get_object(conn, query, many=False):
     return result
 
 
+async def iter_objects(conn, query, size=1000):
+    """Пакетное получение объектов из БД.
+
+    Args:
+        conn (SAConnection): открытое соединение с БД.
+        query (Select): запрос, который нужно отправить в БД.
+        size (int): число строк в пакете.
+
+    Yields:
+        List[...]: очередной пакет строк результата запроса.
+
+    """
+    cursor = await conn.execute(query)
+    try:
+        while True:
+            result = await cursor.fetchmany(size)
+            if not result:
+                break
+            yield result
+    finally:
+        cursor.close()
+
+
+class DeclareCursor(Executable, ClauseElement):
+    """Запрос DECLARE серверного курсора.
+
+    Args:
+        name (str): имя курсора.
+        query (Select): запрос, результат которого читает курсор.
+
+    """
+    def __init__(self, name: str, query):
+        self.name = name
+        self.query = query
+
+
+@compiles(DeclareCursor)
+def _compile_declare_cursor(element, compiler, **kw):
+    return (f'DECLARE {element.name} NO SCROLL CURSOR FOR '
+            f'{compiler.process(element.query, **kw)}')
+
+
+async def iter_objects_server_side(conn, query, size=1000):
+    """Пакетное получение объектов из БД через серверный курсор.
+
+    В отличие от iter_objects, результат запроса не передается клиенту
+    целиком: строки читаются с сервера по size штук (FETCH FORWARD).
+    Асинхронный режим psycopg2 не поддерживает именованные курсоры,
+    поэтому курсор объявляется запросом DECLARE в транзакции.
+    Запросы DECLARE и FETCH выполняются conn.execute, как и query:
+    к параметрам применяются преобразования их типов (Enum, JSONB
+    и т.п.), а к строкам FETCH - преобразования типов столбцов запроса.
+
+    Args:
+        conn (SAConnection): открытое соединение с БД
+            (без начатой транзакции).
+        query (Select): запрос, который нужно отправить в БД.
+        size (int): число строк в пакете.
+
+    Yields:
+        List[...]: очередной пакет строк результата запроса.
+
+    """
+    name = f'excel_cursor_{next(_cursor_ids)}'
+    # Запрос FETCH со столбцами (и их типами) исходного запроса
+    fetch = sql.text(f'FETCH FORWARD {int(size)} FROM {name}').columns(
+        *_get_result_columns(query))
+
+    # Курсор закрывается вместе с транзакцией
+    async with conn.begin():
+        await conn.execute(DeclareCursor(name, query))
+        while True:
+            result = await get_object(conn, fetch, True)
+            if not result:
+                break
+            yield result
+
+
+def _get_result_columns(query) -> list:
+    """Столбцы результата запроса с их типами."""
+    columns = []
+    for query_column in query.c:
+        column = sql.column(query_column.name, query_column.type)
+        # Ключ строки результата - как у столбца исходного запроса
+        column.key = query_column.key
+        columns.append(column)
+    return columns
+
+
 async def get_object_by_field(model, field, conn, value, many=False):
     """Получение объекта БД с отбором по занчению в столбце.
 
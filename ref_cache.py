@@ -0,0 +1,194 @@
+"""Кэш справочников приложения."""
+import asyncio
+import hashlib
+from time import monotonic
+from types import MappingProxyType
+
+from .loggers import getLogger
+from .queries import get_object
+
+logger = getLogger()
+
+
+class Reference:
+    """Справочник кэша ReferenceCache.
+
+    Args:
+        name (str): Имя справочника.
+        loader (Select or callable): Запрос пар (ключ, значение)
+            или асинхронная функция loader(conn) -> dict.
+        ttl (float): Время актуальности справочника в секундах.
+
+    """
+    __slots__ = (
+        'name', 'loader', 'ttl', 'value', 'version', 'generation',
+        'expires', 'lock', 'task',
+    )
+
+    def __init__(self, name: str, loader, ttl: float):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.value = None
+        # Отпечаток содержимого справочника (None - не загружен)
+        self.version = None
+        # Номер сброса справочника (invalidate): загрузка, начатая
+        # до сброса, отбрасывается
+        self.generation = 0
+        self.expires = 0.0
+        self.lock = asyncio.Lock()
+        # Задача фонового обновления
+        self.task = None
+
+    @property
+    def expired(self) -> bool:
+        return monotonic() >= self.expires
+
+
+class ReferenceCache:
+    """Кэш справочников приложения (источники, языки, статусы и т.п.).
+
+    Кэш хранится в приложении aiohttp (app[APP_KEY]) и общий для всех
+    запросов. Устаревший справочник (старше своего ttl) выдается сразу,
+    а обновляется в фоне одной задачей, поэтому запросы к БД
+    за справочниками выполняются только при первой загрузке (setup
+    загружает все справочники при запуске приложения) и после
+    invalidate.
+
+    Args:
+        ttl (optional, float): Время актуальности справочников
+            в секундах по умолчанию.
+
+    """
+    APP_KEY = 'refs'
+    # Задержка повторного обновления после ошибки (сек.)
+    RETRY_DELAY = 10
+
+    def __init__(self, ttl: float=300):
+        self.ttl = ttl
+        self.__app = None
+        self.__refs = {}
+
+    def register(self, name: str, loader, ttl: float=None):
+        """Регистрация справочника.
+
+        Args:
+            name (str): Имя справочника.
+            loader (Select or callable): Запрос пар (ключ, значение)
+                или асинхронная функция loader(conn) -> dict.
+            ttl (optional, float): Время актуальности справочника
+                в секундах (по умолчанию - ttl кэша).
+
+        """
+        self.__refs[name] = Reference(
+            name, loader, self.ttl if ttl is None else ttl)
+
+    def setup(self, app):
+        """Подключение кэша к приложению aiohttp: справочники
+        загружаются при запуске приложения, фоновые обновления
+        отменяются при его остановке.
+        """
+        self.__app = app
+        app[self.APP_KEY] = self
+        app.on_startup.append(self.warm)
+        app.on_cleanup.append(self.close)
+
+    async def _load(self, ref: Reference):
+        generation = ref.generation
+        async with self.__app['db'].acquire() as conn:
+            if callable(ref.loader):
+                value = await ref.loader(conn)
+            else:
+                value = {
+                    row[0]: row[1]
+                    for row in await get_object(conn, ref.loader, True)
+                }
+
+        if generation != ref.generation:
+            logger.debug(f'Reference {ref.name} is invalidated while loading')
+            return
+
+        ref.value = MappingProxyType(dict(value))
+        ref.version = self._get_version(ref.value)
+        ref.expires = monotonic() + ref.ttl
+        logger.debug(f'Reference {ref.name} is loaded: '
+                    f'version={ref.version}, count={len(ref.value)}')
+
+    @staticmethod
+    def _get_version(value) -> str:
+        """Отпечаток содержимого справочника: одинаков в разных
+        процессах и после перезапуска, пока справочник не изменился.
+        """
+        items = sorted(repr(item) for item in value.items())
+        return hashlib.sha256(repr(items).encode()).hexdigest()[:16]
+
+    async def _refresh(self, ref: Reference):
+        """Фоновое обновление устаревшего справочника."""
+        try:
+            async with ref.lock:
+                if ref.expired:
+                    await self._load(ref)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            # До повторной попытки выдается прежнее значение
+            ref.expires = monotonic() + self.RETRY_DELAY
+            logger.error(f'Error: Reference {ref.name} is not refreshed: '
+                        f'{err}')
+        finally:
+            ref.task = None
+
+    async def get(self, name: str) -> MappingProxyType:
+        """Получение справочника.
+
+        Returns:
+            MappingProxyType: Справочник {ключ: значение} (только чтение).
+
+        Raises:
+            KeyError: Справочник не зарегистрирован.
+
+        """
+        ref = self.__refs[name]
+        if ref.value is None:
+            # Повторяем загрузку, отброшенную из-за сброса справочника
+            while ref.value is None:
+                async with ref.lock:
+                    if ref.value is None:
+                        await self._load(ref)
+        elif ref.expired and ref.task is None:
+            ref.task = asyncio.ensure_future(self._refresh(ref))
+
+        return ref.value
+
+    def get_version(self, name: str) -> str:
+        """Отпечаток содержимого справочника (None - не загружен)."""
+        return self.__refs[name].version
+
+    def invalidate(self, name: str=None):
+        """Сброс справочника (или всех справочников): следующее
+        обращение загружает его из БД.
+
+        Args:
+            name (str, optional): Имя справочника
+                (по умолчанию - все справочники).
+
+        """
+        refs = self.__refs.values() if name is None else (self.__refs[name],)
+        for ref in refs:
+            if ref.task is not None:
+                ref.task.cancel()
+                ref.task = None
+            ref.generation += 1
+            ref.value = None
+            ref.version = None
+
+    async def warm(self, app=None):
+        """Загрузка всех справочников."""
+        await asyncio.gather(*(self.get(name) for name in self.__refs))
+
+    async def close(self, app=None):
+        """Отмена фоновых обновлений."""
+        tasks = [ref.task for ref in self.__refs.values() if ref.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,271 @@
+"""Дисковый кэш сформированных отчетов."""
+import hashlib
+import json
+import os
+import pickle
+from datetime import date
+from itertools import islice
+from tempfile import NamedTemporaryFile
+
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+
+from .loggers import getLogger
+
+logger = getLogger()
+
+
+class ReportCache:
+    """Дисковый кэш готовых книг с вытеснением LRU по размеру.
+
+    Книга хранится в файле <ключ>.body, имя её файла - в <ключ>.json.
+    Время изменения файла книги - время последнего обращения к ней:
+    при превышении max_size удаляются давно не запрашиваемые книги.
+
+    Args:
+        dir (str): Директория кэша.
+        max_size (int): Максимальный суммарный размер книг в байтах.
+
+    """
+    BODY = '.body'
+    META = '.json'
+    # Диалект компиляции запросов для отпечатка
+    _DIALECT = PGDialect_psycopg2()
+
+    def __init__(self, dir: str, max_size: int):
+        self.dir = dir
+        self.max_size = max_size
+
+    def _get_path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.dir, key + suffix)
+
+    @classmethod
+    def _normalize(cls, value):
+        """Приведение параметра отчета к виду, пригодному для JSON."""
+        # Запрос SQLAlchemy: текст запроса и его параметры
+        if hasattr(value, 'compile'):
+            compiled = value.compile(dialect=cls._DIALECT)
+            return [str(compiled), cls._normalize(compiled.params)]
+        if isinstance(value, dict):
+            return {str(k): cls._normalize(v) for k, v in value.items()}
+        if isinstance(value, (set, frozenset)):
+            return sorted(cls._normalize(v) for v in value)
+        if isinstance(value, (list, tuple)):
+            return [cls._normalize(v) for v in value]
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return str(value)
+
+    @classmethod
+    def fingerprint(cls, **params) -> str:
+        """Отпечаток параметров отчета (ключ кэша).
+
+        Returns:
+            str: Хэш SHA-256 нормализованных параметров.
+
+        """
+        data = json.dumps(cls._normalize(params), sort_keys=True,
+                            ensure_ascii=False)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    @staticmethod
+    def get_etag(key: str) -> str:
+        return f'"{key}"'
+
+    @staticmethod
+    def match_etag(etag: str, if_none_match: str) -> bool:
+        """Проверка заголовка If-None-Match.
+
+        Args:
+            etag (str): ETag книги.
+            if_none_match (str): Значение заголовка If-None-Match.
+
+        Returns:
+            bool: Клиент уже имеет книгу.
+
+        """
+        if not if_none_match:
+            return False
+
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or any(
+            (tag[2:] if tag.startswith('W/') else tag) == etag for tag in tags)
+
+    def get(self, key: str) -> tuple:
+        """Получение книги из кэша.
+
+        Returns:
+            tuple or None: Имя файла книги и её содержимое.
+
+        """
+        body_path = self._get_path(key, self.BODY)
+        try:
+            with open(self._get_path(key, self.META)) as f:
+                fn = json.load(f)['fn']
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            # Отмечаем обращение к книге
+            os.utime(body_path)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        return fn, body
+
+    def _write(self, path: str, data: bytes):
+        # Запись через временный файл: читатели не видят неполный файл
+        f = NamedTemporaryFile(dir=self.dir, delete=False)
+        try:
+            with f:
+                f.write(data)
+            os.replace(f.name, path)
+        except BaseException:
+            # Не оставляем временный файл прерванной записи
+            f.close()
+            os.unlink(f.name)
+            raise
+
+    def put(self, key: str, fn: str, body: bytes):
+        """Сохранение книги в кэш с вытеснением давно не запрашиваемых.
+
+        Args:
+            key (str): Ключ кэша (отпечаток отчета).
+            fn (str): Имя файла книги.
+            body (bytes): Содержимое книги.
+
+        """
+        os.makedirs(self.dir, exist_ok=True)
+        self._write(self._get_path(key, self.META),
+                    json.dumps({'fn': fn}).encode())
+        self._write(self._get_path(key, self.BODY), body)
+        self.evict()
+
+    def evict(self):
+        """Удаление давно не запрашиваемых книг сверх max_size."""
+        entries = []
+        with os.scandir(self.dir) as it:
+            for entry in it:
+                if entry.name.endswith(self.BODY):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            self.invalidate(name[:-len(self.BODY)])
+            total -= size
+            logger.debug(f'Report cache evicted: {name}')
+
+    def invalidate(self, key: str=None):
+        """Удаление книги (или всех книг) из кэша.
+
+        Args:
+            key (str, optional): Ключ кэша (по умолчанию - все книги).
+
+        """
+        if key is None:
+            try:
+                names = os.listdir(self.dir)
+            except OSError:
+                return
+            keys = {
+                name[:-len(self.BODY)] for name in names
+                if name.endswith(self.BODY)
+            }
+        else:
+            keys = (key,)
+
+        for key in keys:
+            for suffix in (self.BODY, self.META):
+                try:
+                    os.remove(self._get_path(key, suffix))
+                except OSError:
+                    pass
+
+
+class PartitionStore(ReportCache):
+    """Дисковый кэш дневных разделов данных отчета.
+
+    Раздел - отсортированные строки данных отчета за закрытый день,
+    сохраненные порциями pickle в файл <ключ>_<ГГГГММДД>.part.
+    Вытеснение давно не запрашиваемых разделов - как в ReportCache.
+
+    Args:
+        dir (str): Директория кэша.
+        max_size (int): Максимальный суммарный размер разделов в байтах.
+        chunk_size (optional, int): Число строк в одной записи (pickle).
+
+    """
+    BODY = '.part'
+
+    def __init__(self, dir: str, max_size: int, chunk_size: int=1000):
+        super().__init__(dir, max_size)
+        self.chunk_size = chunk_size
+
+    def _get_name(self, key: str, day: date) -> str:
+        return f'{key}_{day:%Y%m%d}'
+
+    @staticmethod
+    def _read(f):
+        try:
+            while True:
+                yield from pickle.load(f)
+        except EOFError:
+            pass
+        finally:
+            f.close()
+
+    def load(self, key: str, day: date):
+        """Получение раздела из кэша.
+
+        Файл раздела открывается сразу, а строки читаются лениво,
+        поэтому вытеснение раздела не прерывает его чтение.
+
+        Returns:
+            iterator or None: Строки раздела.
+
+        """
+        path = self._get_path(self._get_name(key, day), self.BODY)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return None
+
+        # Отмечаем обращение к разделу
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return self._read(f)
+
+    def save(self, key: str, day: date, rows):
+        """Сохранение раздела с вытеснением давно не запрашиваемых.
+
+        Args:
+            key (str): Ключ кэша (отпечаток отчета).
+            day (date): День раздела.
+            rows (iterable): Отсортированные строки раздела.
+
+        """
+        os.makedirs(self.dir, exist_ok=True)
+
+        rows = iter(rows)
+        f = NamedTemporaryFile(dir=self.dir, delete=False)
+        try:
+            with f:
+                chunk = list(islice(rows, self.chunk_size))
+                while chunk:
+                    pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+                    chunk = list(islice(rows, self.chunk_size))
+            os.replace(f.name,
+                        self._get_path(self._get_name(key, day), self.BODY))
+        except BaseException:
+            # Не оставляем временный файл прерванной записи
+            f.close()
+            os.unlink(f.name)
+            raise
+
+        self.evict()
@@ -0,0 +1,257 @@
+"""Компактное хранилище строк, полученных из БД."""
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+from itertools import islice
+
+
+class Row:
+    """Строка хранилища RowStore.
+
+    Представление строки не хранит её значения: они читаются из столбцов
+    хранилища по номеру строки. Доступ к значениям - как у RowProxy:
+    по имени столбца или по его номеру.
+
+    Args:
+        store (RowStore): Хранилище строк.
+        pos (int): Номер строки в хранилище.
+
+    """
+    __slots__ = ('_store', '_pos')
+
+    def __init__(self, store: 'RowStore', pos: int):
+        self._store = store
+        self._pos = pos
+
+    def __getitem__(self, key):
+        store = self._store
+        if isinstance(key, int):
+            return store.columns[key][self._pos]
+        return store.columns[store.index[key]][self._pos]
+
+    def __len__(self) -> int:
+        return len(self._store.keys)
+
+    def __iter__(self):
+        pos = self._pos
+        return (column[pos] for column in self._store.columns)
+
+    def __contains__(self, key) -> bool:
+        return key in self._store.index
+
+    def __eq__(self, other) -> bool:
+        return tuple(self) == tuple(other)
+
+    def __repr__(self) -> str:
+        return repr(tuple(self))
+
+    def get(self, key, default=None):
+        return self[key] if key in self._store.index else default
+
+    def keys(self) -> tuple:
+        return self._store.keys
+
+    def values(self) -> tuple:
+        return tuple(self)
+
+    def items(self) -> list:
+        return list(zip(self._store.keys, self))
+
+
+class RowIndex(Mapping):
+    """Индекс строк хранилища по значению столбца (идентификатору).
+
+    Если значения столбца строго возрастают (выборка упорядочена
+    по идентификатору), строка ищется двоичным поиском по самому столбцу,
+    иначе строится словарь {значение: номер строки}.
+
+    Args:
+        store (RowStore): Хранилище строк.
+        key (str): Имя столбца индекса.
+
+    """
+    def __init__(self, store: 'RowStore', key: str):
+        self._store = store
+        self._column = column = store.columns[store.index[key]]
+
+        if all(a < b for a, b in zip(column, islice(column, 1, None))):
+            self._positions = None
+        else:
+            self._positions = {value: pos for pos, value in enumerate(column)}
+
+    def _get_pos(self, value) -> int:
+        if self._positions is not None:
+            return self._positions[value]
+
+        column = self._column
+        pos = bisect_left(column, value)
+        if pos == len(column) or column[pos] != value:
+            raise KeyError(value)
+        return pos
+
+    def __getitem__(self, value) -> Row:
+        try:
+            return Row(self._store, self._get_pos(value))
+        except TypeError:
+            raise KeyError(value)
+
+    def __contains__(self, value) -> bool:
+        try:
+            self._get_pos(value)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._column)
+
+    def __iter__(self):
+        return iter(self._column)
+
+
+class RowStore:
+    """Компактное хранилище строк выборки из БД.
+
+    Значения хранятся по столбцам с общим для всех строк индексом
+    имен столбцов; строки отдаются представлениями Row. После compact
+    целочисленные и вещественные столбцы хранятся в типизированных
+    массивах (array), остальные - в кортежах.
+
+    Args:
+        keys (iterable of str, optional): Имена столбцов (по умолчанию
+            берутся из первой добавленной строки).
+
+    """
+    # Типы массивов столбцов: (тип значений, код типа array)
+    ARRAY_TYPES = (
+        (int, 'q'),
+        (float, 'd'),
+    )
+
+    def __init__(self, keys=None):
+        self.keys = None
+        self.index = {}
+        self.columns = []
+        self.__indexes = {}
+
+        if keys is not None:
+            self._set_keys(keys)
+
+    def _set_keys(self, keys):
+        self.keys = tuple(keys)
+        self.index = {key: cn for cn, key in enumerate(self.keys)}
+        self.columns = [[] for _ in self.keys]
+
+    def extend(self, rows):
+        """Добавление строк.
+
+        Args:
+            rows (list of RowProxy): Строки выборки (последовательности
+                значений столбцов с методом keys).
+
+        """
+        if not rows:
+            return
+
+        if self.keys is None:
+            self._set_keys(rows[0].keys())
+
+        for column, values in zip(self.columns, zip(*rows)):
+            column.extend(values)
+
+        self.__indexes.clear()
+
+    def compact(self) -> 'RowStore':
+        """Перевод столбцов в компактное представление.
+
+        Returns:
+            RowStore: Хранилище строк (self).
+
+        """
+        self.columns = [self._compact(column) for column in self.columns]
+        self.__indexes.clear()
+        return self
+
+    @classmethod
+    def _compact(cls, column):
+        if isinstance(column, (array, tuple)):
+            return column
+
+        for value_type, typecode in cls.ARRAY_TYPES:
+            # bool - подкласс int, но в массиве станет числом
+            if column and all(type(v) is value_type for v in column):
+                try:
+                    return array(typecode, column)
+                except OverflowError:
+                    break
+
+        return tuple(column)
+
+    def convert(self, key: str, func) -> 'RowStore':
+        """Пакетное преобразование значений столбца.
+
+        Args:
+            key (str): Имя столбца.
+            func (callable): Функция преобразования всего столбца
+                (последовательность значений -> последовательность
+                значений той же длины).
+
+        Returns:
+            RowStore: Хранилище строк (self).
+
+        """
+        cn = self.index[key]
+        self.columns[cn] = self._compact(func(self.columns[cn]))
+        self.__indexes.pop(key, None)
+        return self
+
+    def copy(self) -> 'RowStore':
+        """Копия хранилища для преобразования столбцов (convert).
+
+        Значения столбцов не копируются: convert заменяет столбец
+        копии, не меняя исходное хранилище.
+
+        Returns:
+            RowStore: Копия хранилища строк.
+
+        """
+        store = RowStore()
+        store.keys = self.keys
+        store.index = self.index
+        store.columns = list(self.columns)
+        return store
+
+    def get_index(self, key: str='id') -> RowIndex:
+        """Индекс строк по значению столбца (строится однажды).
+
+        Args:
+            key (str, optional): Имя столбца индекса (по умолчанию - id).
+
+        Returns:
+            RowIndex: Индекс строк {значение: строка}.
+
+        """
+        try:
+            return self.__indexes[key]
+        except KeyError:
+            index = self.__indexes[key] = RowIndex(self, key)
+            return index
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [Row(self, p) for p in range(len(self))[pos]]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError('RowStore index out of range')
+        return Row(self, pos)
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield Row(self, pos)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
@@ -0,0 +1,41 @@
+"""Окружение тестов: пакет excel_api и конфигурация.
+
+Модули пакета импортируют друг друга относительно, поэтому тесты
+импортируют их как excel_api.<модуль>: директория репозитория
+подключается под этим именем ссылкой во временной директории
+(в sys.path - и для процессов пула, запущенных spawn/forkserver).
+Конфигурация читается модулями при импорте, поэтому CONFIG_PATH
+задается до импорта тестов.
+"""
+import os
+import sys
+import tempfile
+
+PACKAGE = 'excel_api'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix='excel_api_tests_')
+
+CONFIG = f'''
+logging:
+  formatters:
+    logstash:
+      extra:
+        application: app
+reports:
+  dir: {os.path.join(TMP_DIR, 'reports')}
+migrations:
+  excel:
+    dir: {os.path.join(TMP_DIR, 'migrations')}
+'''
+
+if os.path.basename(ROOT) == PACKAGE:
+    sys.path.insert(0, os.path.dirname(ROOT))
+else:
+    os.symlink(ROOT, os.path.join(TMP_DIR, PACKAGE))
+    sys.path.insert(0, TMP_DIR)
+
+if 'CONFIG_PATH' not in os.environ:
+    config_path = os.path.join(TMP_DIR, 'config.yaml')
+    with open(config_path, 'w') as f:
+        f.write(CONFIG)
+    os.environ['CONFIG_PATH'] = config_path
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from excel_api import excel_dates
+from excel_api.excel_dates import ExcelDateConverter
+
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+def to_excel(ts, tz):
+    """Эталон: местное время pytz в числовом формате дат excel."""
+    local = datetime.fromtimestamp(ts, tz).replace(tzinfo=None)
+    return (local - EXCEL_EPOCH) / timedelta(days=1)
+
+
+def get_timestamps(tz, start, end):
+    """Время вокруг переходов смещения зоны между start и end (UTC)."""
+    transitions = [
+        t for t in tz._utc_transition_times if start <= t <= end
+    ]
+    assert transitions
+    epoch = datetime(1970, 1, 1)
+    return [
+        (t - epoch).total_seconds() + delta
+        for t in transitions
+        for delta in (-3601, -1, 0, 1, 1800, 3601)
+    ]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        if excel_dates.numpy is None:
+            pytest.skip('NumPy is not installed')
+    else:
+        monkeypatch.setattr(excel_dates, 'numpy', None)
+    return request.param
+
+
+@pytest.mark.parametrize('zone, start, end', [
+    # Летнее время в Москве до 2011 года и переход на UTC+3 в 2014
+    ('Europe/Moscow', datetime(2009, 1, 1), datetime(2015, 1, 1)),
+    ('Europe/Berlin', datetime(2019, 1, 1), datetime(2021, 1, 1)),
+    ('America/New_York', datetime(2020, 1, 1), datetime(2021, 1, 1)),
+])
+def test_matches_pytz_across_transitions(backend, zone, start, end):
+    tz = pytz.timezone(zone)
+    timestamps = get_timestamps(tz, start, end)
+    converter = ExcelDateConverter(tz)
+
+    expected = [to_excel(ts, tz) for ts in timestamps]
+    assert list(converter(timestamps)) == pytest.approx(expected, abs=1e-9)
+    # Неупорядоченное время
+    assert (list(converter(timestamps[::-1]))
+            == pytest.approx(expected[::-1], abs=1e-9))
+    assert ([converter.to_excel(ts) for ts in timestamps]
+            == pytest.approx(expected, abs=1e-9))
+
+
+def test_nulls(backend):
+    tz = pytz.timezone('Europe/Moscow')
+    converter = ExcelDateConverter(tz)
+
+    result = converter([0, None, 86400])
+
+    assert result[1] is None
+    assert result[0] == pytest.approx(to_excel(0, tz))
+    assert result[2] == pytest.approx(to_excel(86400, tz))
+    assert converter.to_excel(None) is None
+
+
+def test_fixed_offset_zone(backend):
+    converter = ExcelDateConverter(pytz.FixedOffset(180))
+
+    assert list(converter([0])) == pytest.approx([25569 + 3 / 24])
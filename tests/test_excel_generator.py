@@ -0,0 +1,536 @@
+import asyncio
+from array import array
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from zipfile import ZipFile
+
+import pytest
+from aiohttp import ClientPayloadError, web
+from aiohttp.test_utils import TestClient, TestServer
+from openpyxl import load_workbook
+from pytz import utc
+from xlrd import XL_CELL_DATE, open_workbook, xldate_as_datetime
+
+from excel_api.excel_generator import (
+    ExcelBackend,
+    ExcelColors,
+    ExcelGenerator,
+    ExcelSheetBase,
+    ReportFormat,
+    ResponseStream,
+    write_sheet_part,
+)
+from excel_api.excel_utils import Compression
+from excel_api.excel_writer import XlsxWorkbook
+
+SHEET = 'sheet'
+OTHER = 'other'
+NAME = 'name'
+VALUE = 'value'
+CREATED_AT = ExcelSheetBase.CREATED_AT
+COLORED = ExcelSheetBase.COLORED
+
+
+class Generator(ExcelGenerator):
+    """Генератор с собственной архитектурой таблиц."""
+    ALL = {
+        SHEET: {
+            'sheet': {
+                '№':            ExcelSheetBase.ROW_NUM,
+                'Имя':          NAME,
+                'Значение':     VALUE,
+                'Дата':         CREATED_AT,
+            },
+            'sheet_name':       'Таблица',
+        },
+        OTHER: {
+            'sheet': {
+                '№':            ExcelSheetBase.ROW_NUM,
+                'Имя':          NAME,
+            },
+            'sheet_name':       'Другая таблица',
+        },
+    }
+
+    def _get_excel_job(self):
+        _, *job = super()._get_excel_job()
+        return (Generator, *job)
+
+
+def get_data(count=5):
+    return [
+        {
+            NAME: f'name{i % 3}',
+            VALUE: None if i % 4 == 0 else i / 2,
+            CREATED_AT: datetime(2020, 1, 2, 10) + timedelta(minutes=i),
+            COLORED: ExcelColors.RED if i % 2 else None,
+        }
+        for i in range(count)
+    ]
+
+
+def read_back(generator):
+    generator.save_excel_to_fd()
+    return load_workbook(BytesIO(generator.fd.getvalue()))
+
+
+def round_time(value):
+    """Время с точностью до секунды."""
+    if isinstance(value, datetime):
+        return (value + timedelta(microseconds=500000)).replace(microsecond=0)
+    return value
+
+
+def get_cells(ws):
+    """Значения, стили и форматы чисел ячеек таблицы."""
+    return [
+        [(c.value, c.style, c.number_format) for c in row]
+        for row in ws.iter_rows()
+    ]
+
+
+def test_write_only_matches_regular_workbook():
+    regular = Generator('v', data={SHEET: get_data()})
+    regular.generate_excel()
+    write_only = Generator('v', data={SHEET: get_data()}, write_only=True)
+    write_only.generate_excel()
+
+    assert write_only.wb.write_only
+    expected = read_back(regular)['Таблица']
+    ws = read_back(write_only)['Таблица']
+    assert get_cells(ws) == get_cells(expected)
+    assert ws.column_dimensions['B'].width == pytest.approx(
+        expected.column_dimensions['B'].width)
+
+
+def test_rows_are_written_in_one_pass():
+    data = get_data()
+    data[1][ExcelSheetBase.ROW_NUM] = 'A'
+    generator = Generator('v', data={SHEET: data})
+    generator.generate_excel()
+
+    ws = read_back(generator)['Таблица']
+    rows = [[c.value for c in row] for row in ws.iter_rows()]
+
+    assert rows[0] == ['№', 'Имя', 'Значение', 'Дата']
+    # Заданный номер строки сохраняется, остальные нумеруются по порядку
+    assert [row[0] for row in rows[1:]] == [1, 'A', 2, 3, 4]
+    assert [row[1] for row in rows[1:]] == [d[NAME] for d in data]
+    # Пустое значение заменяется заполнителем
+    assert rows[1][2] == ExcelGenerator.NULL_SYMB_TO_CELL
+    assert rows[3][2] == 1.0
+
+
+def test_row_styles_follow_row_color():
+    generator = Generator('v')
+    plan = generator.get_sheet_plan(SHEET)
+
+    plain, colored = plan.get_rows(get_data(2), '-', COLORED)
+
+    assert [style for _, style in plain[1:]] == [
+        plan.cell_styles[1], plan.null_style, plan.cell_styles[3]]
+    assert [style for _, style in colored[1:]] == [
+        f'{name}_{ExcelColors.RED}' for name in plan.cell_styles[1:]]
+    # Нумерованный столбец не окрашивается
+    assert colored[0] == (2, plan.number_style)
+
+
+def get_stream(generate):
+    """Ответ сервера aiohttp, книгу которого формирует generate(request)."""
+    async def handler(request):
+        return await generate(request)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/', handler)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get('/')
+            return response, await response.read()
+
+    return asyncio.run(main())
+
+
+def test_stream_response(monkeypatch):
+    monkeypatch.setattr(ResponseStream, 'CHUNK_SIZE', 1024)
+    data = get_data(500)
+    generator = Generator('v', data={SHEET: data}, write_only=True)
+
+    response, body = get_stream(generator.get_stream_response)
+
+    assert response.status == 200
+    assert 'attachment;filename=' in response.headers['Content-Disposition']
+    assert generator.wb is None
+    ws = load_workbook(BytesIO(body))['Таблица']
+    assert ws.max_row == len(data) + 1
+
+
+def test_stream_response_of_saved_workbook():
+    generator = Generator('v', data={SHEET: get_data()})
+    generator.generate_excel()
+    generator.save_excel_to_fd()
+    expected = generator.fd.getvalue()
+    saved = Generator('v')
+    saved._set_excel(generator.fn, expected)
+
+    response, body = get_stream(saved.generate_stream_response)
+
+    assert response.status == 200
+    assert body == expected
+
+
+def test_stream_is_aborted_when_saving_fails():
+    generator = Generator('v', data={SHEET: get_data()})
+
+    async def generate(request):
+        generator.generate_excel()
+        save = generator.wb.save
+
+        def fail(stream):
+            save(stream)
+            raise OSError('disk is full')
+
+        generator.wb.save = fail
+        return await generator.generate_stream_response(request)
+
+    with pytest.raises(ClientPayloadError):
+        get_stream(generate)
+    assert generator.wb is None
+
+
+def test_sheet_plan():
+    generator = Generator('v')
+    sheet_style = generator.EXCEL_SHEET
+
+    plan = generator.get_sheet_plan(SHEET)
+
+    assert plan.headers == ('№', 'Имя', 'Значение', 'Дата')
+    assert plan.keys == (ExcelSheetBase.ROW_NUM, NAME, VALUE, CREATED_AT)
+    assert plan.cell_styles[3] == sheet_style.CELL_DATE_STYLE.name
+    assert plan.number_formats[3] == sheet_style.CELL_DATE_STYLE.number_format
+    assert plan.widths == tuple(
+        sheet_style.get_width(key) for key in plan.keys)
+
+
+def test_sheet_plan_is_compiled_once():
+    generator = Generator('v')
+    plan = generator.get_sheet_plan(SHEET)
+
+    assert generator.get_sheet_plan(SHEET) is plan
+    assert generator.get_sheet_plan(OTHER) is not plan
+
+    # Другие стили столбцов - другой план
+    sheet_style = generator.EXCEL_SHEET.with_styles(
+        generator.EXCEL_SHEET.STYLES_DATETIME)
+    datetime_plan = sheet_style.get_plan(SHEET, generator.get_sheet(SHEET))
+    assert datetime_plan.cell_styles[3] == (
+        sheet_style.CELL_DATETIME_STYLE.name)
+    assert generator.get_sheet_plan(SHEET) is plan
+
+
+def test_colored_rows_use_registered_color_styles():
+    generator = Generator('v', data={SHEET: get_data(2)})
+    generator.generate_excel()
+    sheet_style = generator.EXCEL_SHEET
+
+    assert set(generator.wb.named_styles) >= {
+        style.name for style in sheet_style.NAMED_STYLES}
+    ws = read_back(generator)['Таблица']
+    plain, colored = ws['B2'], ws['B3']
+    assert colored.style == f'{plain.style}_{ExcelColors.RED}'
+    assert colored.fill.fgColor.rgb == sheet_style.COLORS[ExcelColors.RED]
+    assert ws['D3'].number_format == ws['D2'].number_format
+
+
+def test_native_backend_matches_openpyxl():
+    def get_sheet(backend):
+        generator = Generator('v', data={SHEET: get_data()},
+                                backend=backend)
+        generator.generate_excel()
+        return read_back(generator)['Таблица']
+
+    def get_values(ws):
+        # openpyxl записывает время с погрешностью в доли секунды
+        return [
+            [(round_time(value), *style) for value, *style in row]
+            for row in get_cells(ws)
+        ]
+
+    expected = get_sheet(ExcelBackend.OPENPYXL)
+    ws = get_sheet(ExcelBackend.NATIVE)
+
+    assert get_values(ws) == get_values(expected)
+    for row, expected_row in zip(ws.iter_rows(), expected.iter_rows()):
+        for cell, expected_cell in zip(row, expected_row):
+            for name in ('font', 'fill', 'border', 'alignment', 'protection'):
+                assert (repr(getattr(cell, name))
+                        == repr(getattr(expected_cell, name)))
+
+
+def get_workbook_values(generator):
+    generator.generate_excel()
+    return {
+        ws.title: [[c.value for c in row] for row in ws.iter_rows()]
+        for ws in read_back(generator)
+    }
+
+
+def test_sheets_generated_in_process_pool():
+    def generate(processes):
+        return get_workbook_values(Generator(
+            'v', data={SHEET: get_data(50), OTHER: get_data(20)},
+            backend=ExcelBackend.NATIVE, processes=processes))
+
+    assert generate(2) == generate(0)
+
+
+def test_failed_sheet_in_process_pool():
+    data = get_data(20)
+    del data[10][NAME]
+    generator = Generator('v', data={SHEET: get_data(50), OTHER: data},
+                            backend=ExcelBackend.NATIVE, processes=2)
+
+    with pytest.raises(KeyError):
+        generator.generate_excel()
+
+    # Пул процессов остается рабочим
+    generator = Generator('v', data={SHEET: get_data(), OTHER: get_data()},
+                            backend=ExcelBackend.NATIVE, processes=2)
+    assert len(get_workbook_values(generator)['Другая таблица']) == 6
+
+
+def test_failed_sheet_part_removes_temp_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    generator = Generator('v')
+    styles = XlsxWorkbook().add_named_styles(
+        generator.EXCEL_SHEET.NAMED_STYLES)
+    data = get_data()
+    del data[3][VALUE]
+
+    with pytest.raises(KeyError):
+        write_sheet_part(generator.get_sheet_plan(SHEET), data, '-',
+                            COLORED, styles)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_generate_excel_async():
+    generator = Generator('v', data={SHEET: get_data()})
+
+    response = asyncio.run(generator.get_response_async())
+
+    ws = load_workbook(BytesIO(response.body))['Таблица']
+    assert ws.max_row == 6
+    assert generator.wb is None
+
+
+def test_generate_excel_in_process_pool():
+    data = get_data()
+    expected = get_workbook_values(Generator('v', data={SHEET: data}))
+
+    with ProcessPoolExecutor(1) as executor:
+        generator = Generator('v', data={SHEET: data}, executor=executor)
+        response = asyncio.run(generator.get_response_async())
+
+    book = load_workbook(BytesIO(response.body))
+    assert {
+        ws.title: [[c.value for c in row] for row in ws.iter_rows()]
+        for ws in book
+    } == expected
+    assert generator.fn.endswith('.xlsx')
+
+
+class LimitedGenerator(Generator):
+    MAX_CONCURRENCY = 2
+
+    active = peak = 0
+    lock = threading.Lock()
+
+    def generate_excel(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            threading.Event().wait(0.05)
+            super().generate_excel()
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+def test_concurrent_generations_are_limited():
+    async def main(executor):
+        await asyncio.gather(*(
+            LimitedGenerator('v', data={SHEET: get_data()},
+                                executor=executor).generate_excel_async()
+            for _ in range(6)
+        ))
+
+    with ThreadPoolExecutor(6) as executor:
+        asyncio.run(main(executor))
+
+    assert LimitedGenerator.peak == LimitedGenerator.MAX_CONCURRENCY
+
+
+def get_body(**kwargs):
+    generator = Generator('v', data={SHEET: get_data(300)}, **kwargs)
+    generator.generate_excel()
+    generator.save_excel_to_fd()
+    return generator.fd.getvalue()
+
+
+@pytest.mark.parametrize('backend', [ExcelBackend.OPENPYXL,
+                                        ExcelBackend.NATIVE])
+@pytest.mark.parametrize('compression', sorted(Compression.ALL))
+def test_compression_profiles(backend, compression):
+    body = get_body(backend=backend, compression=compression)
+
+    compress_type, _ = Compression.ALL[compression]
+    with ZipFile(BytesIO(body)) as archive:
+        assert {info.compress_type for info in archive.infolist()} == {
+            compress_type}
+    ws = load_workbook(BytesIO(body))['Таблица']
+    assert ws.max_row == 301
+
+
+def test_compression_profiles_trade_size():
+    sizes = {
+        compression: len(get_body(backend=ExcelBackend.NATIVE,
+                                    compression=compression))
+        for compression in Compression.ALL
+    }
+
+    assert (sizes[Compression.STORED] > sizes[Compression.FASTEST]
+            >= sizes[Compression.BALANCED] >= sizes[Compression.SMALLEST])
+
+
+def read_xls(generator):
+    generator.save_excel_to_fd()
+    return open_workbook(file_contents=generator.fd.getvalue())
+
+
+def test_xls_workbook():
+    data = get_data()
+    data[2][CREATED_AT] = data[2][CREATED_AT].replace(tzinfo=utc)
+    generator = Generator('v', data={SHEET: data, OTHER: get_data(2)},
+                            report_format=ReportFormat.EXCEL_2003)
+    generator.generate_excel()
+
+    book = read_xls(generator)
+
+    assert generator.fn.endswith('.xls')
+    assert book.sheet_names() == ['Таблица', 'Другая таблица']
+    sh = book.sheet_by_index(0)
+    assert sh.row_values(0) == ['№', 'Имя', 'Значение', 'Дата']
+    assert sh.nrows == len(data) + 1
+    assert sh.row_values(1)[:3] == [1, 'name0', '-']
+    assert sh.row_values(2)[:3] == [2, 'name1', 0.5]
+    assert sh.cell_type(3, 3) == XL_CELL_DATE
+    assert (xldate_as_datetime(sh.cell_value(3, 3), book.datemode)
+            == datetime(2020, 1, 2, 10, 2))
+
+
+class SmallXlsGenerator(Generator):
+    XLS_MAX_ROWS = 4
+    XLS_FLUSH_ROWS = 2
+
+
+def test_xls_rows_continue_on_next_sheet():
+    generator = SmallXlsGenerator('v', data={SHEET: get_data(10)},
+                                    report_format=ReportFormat.EXCEL_2003)
+    generator.generate_excel()
+
+    book = read_xls(generator)
+
+    assert book.sheet_names() == [
+        'Таблица', 'Таблица (2)', 'Таблица (3)', 'Таблица (4)']
+    numbers = []
+    for sh in book.sheets():
+        assert sh.row_values(0)[0] == '№'
+        numbers += sh.col_values(0, start_rowx=1)
+    assert numbers == list(range(1, 11))
+
+
+def test_xls_to_xlsx_keeps_types():
+    data = get_data(3)
+    data[0][CREATED_AT] = date(2020, 1, 2)
+    data[1][VALUE] = True
+    generator = Generator('v', data={SHEET: data},
+                            report_format=ReportFormat.EXCEL_2003)
+    generator.generate_excel()
+
+    generator._to_xlsx()
+    fd = BytesIO()
+    generator.save_excel_to_fd(fd)
+
+    assert generator.fn.endswith('.xlsx')
+    ws = load_workbook(fd)['Таблица']
+    assert [c.value for c in ws[1]] == ['№', 'Имя', 'Значение', 'Дата']
+    assert [c.value for c in ws[2]][:3] == [1, 'name0', '-']
+    assert ws['C3'].value is True
+    date_format = generator.EXCEL_SHEET.CELL_DATE_STYLE.number_format
+    datetime_format = generator.EXCEL_SHEET.CELL_DATETIME_STYLE.number_format
+    # Дата без времени (полночь) - в формате даты
+    assert ws['D2'].value == datetime(2020, 1, 2)
+    assert ws['D2'].number_format == date_format
+    assert ws['D3'].value == datetime(2020, 1, 2, 10, 1)
+    assert ws['D3'].number_format == datetime_format
+
+
+def to_columns(data):
+    return {key: [d[key] for d in data] for key in data[0]}
+
+
+def test_column_data_matches_row_data():
+    data = get_data()
+    columns = to_columns(data)
+    columns[VALUE] = array('d', [0.5 * i for i in range(len(data))])
+    for d, value in zip(data, columns[VALUE]):
+        d[VALUE] = value
+
+    expected = get_workbook_values(Generator('v', data={SHEET: data}))
+    values = get_workbook_values(Generator('v', data={SHEET: columns}))
+
+    assert values == expected
+
+
+def test_column_data_styles():
+    data = get_data(2)
+    plan = Generator('v').get_sheet_plan(SHEET)
+
+    rows = list(plan.get_rows(to_columns(data), '-', COLORED))
+
+    assert rows == list(plan.get_rows(data, '-', COLORED))
+
+
+def test_missing_column_is_empty():
+    columns = to_columns(get_data(2))
+    del columns[VALUE]
+
+    values = get_workbook_values(Generator('v', data={SHEET: columns}))
+
+    assert [row[2] for row in values['Таблица'][1:]] == ['-', '-']
+
+
+def test_numpy_columns():
+    numpy = pytest.importorskip('numpy')
+    data = get_data()
+    columns = to_columns(data)
+    columns[VALUE] = numpy.arange(len(data), dtype=float)
+    for d, value in zip(data, range(len(data))):
+        d[VALUE] = float(value)
+
+    assert (get_workbook_values(Generator('v', data={SHEET: columns}))
+            == get_workbook_values(Generator('v', data={SHEET: data})))
+
+
+def test_columns_of_different_length():
+    columns = to_columns(get_data(3))
+    columns[NAME].pop()
+    plan = Generator('v').get_sheet_plan(SHEET)
+
+    with pytest.raises(ValueError):
+        list(plan.get_rows(columns, '-', COLORED))
@@ -0,0 +1,48 @@
+from collections import OrderedDict
+
+import pytest
+from xlwt import Font
+
+from excel_api.excel_utils_2003 import Style2003
+
+
+@pytest.fixture
+def styles(monkeypatch):
+    """Пустой кэш стилей на время теста."""
+    monkeypatch.setattr(Style2003, '_styles', OrderedDict())
+    return Style2003._styles
+
+
+def test_equal_styles_are_shared(styles):
+    style = Style2003(font_size=12, num_format_str='0').get_style()
+
+    assert Style2003(font_size=12, num_format_str='0').get_style() is style
+    assert Style2003(style=style).get_style() is style
+    assert Style2003(font_size=14, num_format_str='0').get_style() is not style
+    assert len(styles) == 2
+
+
+def test_style_keeps_copies_of_components(styles):
+    font = Font()
+    font.bold = True
+    style = Style2003(font=font).get_style()
+
+    font.bold = False
+
+    assert style.font.bold
+    assert style.font is not font
+    assert Style2003(font=font).get_style() is not style
+
+
+def test_cache_is_bounded(styles, monkeypatch):
+    monkeypatch.setattr(Style2003, 'STYLES_CACHE_SIZE', 3)
+    first, second, _ = (
+        Style2003(font_size=size).get_style() for size in range(1, 4))
+    # После обращения к первому стилю давно не запрашиваемый - второй
+    assert Style2003(font_size=1).get_style() is first
+
+    Style2003(font_size=4).get_style()
+
+    assert len(styles) == 3
+    assert Style2003(font_size=1).get_style() is first
+    assert Style2003(font_size=2).get_style() is not second
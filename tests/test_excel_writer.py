@@ -0,0 +1,150 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from io import BytesIO
+from zipfile import ZipFile
+
+import pytest
+from openpyxl import load_workbook
+from openpyxl.styles import Font, NamedStyle, Protection
+
+from excel_api.excel_writer import XlsxWorkbook, XlsxWorksheet
+
+STYLES = (
+    NamedStyle('header', font=Font(bold=True)),
+    NamedStyle('cell'),
+    NamedStyle('cell_date', number_format='dd.mm.yyyy'),
+    NamedStyle('cell_datetime', number_format='dd.mm.yyyy hh:mm'),
+    NamedStyle('cell_unlocked',
+                protection=Protection(locked=False, hidden=True)),
+)
+
+
+def save(wb):
+    fd = BytesIO()
+    wb.save(fd)
+    return fd
+
+
+def read_back(wb):
+    return load_workbook(save(wb))
+
+
+def test_values_and_styles():
+    wb = XlsxWorkbook()
+    styles = wb.add_named_styles(STYLES)
+    sh = wb.create_sheet('Отчет <1>')
+    sh.shared_strings = (True, False)
+    sh.append([('Источник', 'header'), ('Описание', 'header')], styles)
+    sh.append([('src', 'cell'), ('a & <b>\x01', 'cell')], styles)
+    sh.append([(1, 'cell'), (2.5, 'cell')], styles)
+    sh.append([(True, 'cell'), (None, 'cell')], styles)
+    sh.append([(date(2020, 1, 2), 'cell_date'),
+                (datetime(2020, 1, 2, 10, 30), 'cell_datetime')], styles)
+    sh.append([(time(12), 'cell'), (Decimal('1.5'), 'cell')], styles)
+    sh.column_dimensions['B'].width = 40
+
+    ws = read_back(wb)['Отчет <1>']
+
+    assert [[c.value for c in row] for row in ws.iter_rows(max_row=4)] == [
+        ['Источник', 'Описание'],
+        ['src', 'a & <b>'],
+        [1, 2.5],
+        [True, None],
+    ]
+    assert ws['A1'].font.bold
+    assert ws['A5'].value == datetime(2020, 1, 2)
+    assert ws['A5'].number_format == 'dd.mm.yyyy'
+    assert ws['B5'].value == datetime(2020, 1, 2, 10, 30)
+    assert ws['B5'].number_format == 'dd.mm.yyyy hh:mm'
+    assert ws['A6'].value == pytest.approx(0.5)
+    assert ws['B6'].value == 1.5
+    assert ws.column_dimensions['B'].width == 40
+
+
+def test_cells_keep_named_styles_and_protection():
+    wb = XlsxWorkbook()
+    styles = wb.add_named_styles(STYLES)
+    sh = wb.create_sheet('s')
+    sh.append([(1, 'cell'), (2, 'cell_unlocked'), (3, 'header')], styles)
+
+    book = read_back(wb)
+    ws = book.active
+
+    assert set(book.named_styles) >= {style.name for style in STYLES}
+    assert [c.style for c in ws[1]] == ['cell', 'cell_unlocked', 'header']
+    assert ws['A1'].protection.locked
+    assert not ws['B1'].protection.locked
+    assert ws['B1'].protection.hidden
+
+
+@pytest.mark.parametrize('value', [
+    float('nan'), float('inf'), float('-inf'), Decimal('NaN'),
+])
+def test_non_finite_numbers_are_errors(value):
+    wb = XlsxWorkbook()
+    styles = wb.add_named_styles(STYLES)
+    sh = wb.create_sheet('s')
+    sh.append([(value, 'cell'), (1, 'cell')], styles)
+
+    ws = read_back(wb).active
+
+    assert ws['A1'].value == '#NUM!'
+    assert ws['A1'].data_type == 'e'
+    assert ws['B1'].value == 1
+
+
+def test_shared_strings_per_column():
+    wb = XlsxWorkbook()
+    styles = wb.add_named_styles(STYLES)
+    sh = wb.create_sheet('s')
+    sh.shared_strings = (True, False)
+    for i in range(4):
+        sh.append([(f'src{i % 2}', 'cell'), (f'text{i}', 'cell'),
+                    (f'status{i % 2}', 'cell')], styles)
+
+    fd = save(wb)
+    with ZipFile(fd) as archive:
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        strings = archive.read('xl/sharedStrings.xml').decode()
+
+    # Столбец без признака использует таблицу общих строк
+    assert sheet.count('t="s"') == 8
+    assert sheet.count('t="inlineStr"') == 4
+    assert 'count="8" uniqueCount="4"' in strings
+    ws = load_workbook(fd).active
+    assert [[c.value for c in row] for row in ws.iter_rows(max_row=2)] == [
+        ['src0', 'text0', 'status0'],
+        ['src1', 'text1', 'status1'],
+    ]
+
+
+def test_shared_strings_across_sheets():
+    wb = XlsxWorkbook()
+    styles = wb.add_named_styles(STYLES)
+    for title in ('a', 'b'):
+        sh = wb.create_sheet(title)
+        for i in range(3):
+            sh.append([(f'src{i % 2}', 'cell')], styles)
+
+    book = read_back(wb)
+
+    assert book.sheetnames == ['a', 'b']
+    for ws in book:
+        assert [c.value for c, in ws.iter_rows()] == ['src0', 'src1', 'src0']
+
+
+def test_attach_detached_rows(tmp_path):
+    wb = XlsxWorkbook()
+    styles = wb.add_named_styles(STYLES)
+    part = XlsxWorksheet(None, None, open(tmp_path / 'part', 'wb'))
+    part.append([('header', 'header')], styles)
+    part.write_rows([[(i, 'cell')] for i in range(3)], styles)
+    path, rows = part.detach()
+
+    sh = wb.create_sheet('s')
+    sh.attach(path, rows)
+
+    assert sh.max_row == 4
+    assert not (tmp_path / 'part').exists()
+    ws = read_back(wb).active
+    assert [c.value for c, in ws.iter_rows()] == ['header', 0, 1, 2]
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from excel_api.external_sort import ExternalSorter
+
+
+def key(row):
+    return row[0]
+
+
+def get_rows(count, seed=1):
+    rnd = random.Random(seed)
+    # Повторяющиеся ключи проверяют устойчивость сортировки
+    return [(rnd.randint(0, 50), i) for i in range(count)]
+
+
+def test_sorted_in_memory_returns_list():
+    rows = get_rows(100)
+    sorter = ExternalSorter(key, max_rows=1000)
+    sorter.extend(rows)
+
+    result = sorter.sorted()
+
+    assert not sorter.spilled
+    assert isinstance(result, list)
+    assert result == sorted(rows, key=key)
+
+
+def test_spill_and_merge_is_stable():
+    rows = get_rows(10007)
+    sorter = ExternalSorter(key, max_rows=1000, chunk_size=100)
+    sorter.extend(rows)
+
+    assert sorter.spilled
+    assert len(sorter) == len(rows)
+    assert list(sorter.sorted()) == sorted(rows, key=key)
+
+
+def test_runs_are_merged_in_bounded_groups():
+    rows = get_rows(5000)
+    sorter = ExternalSorter(key, max_rows=10, chunk_size=3, max_runs=4)
+    sorter.extend(rows[:2000])
+    for start in range(2000, 5000, 100):
+        sorter.add_run(sorted(rows[start:start + 100], key=key), 100)
+
+    assert len(sorter) == len(rows)
+    assert list(sorter.sorted()) == sorted(rows, key=key)
+
+
+def test_close_removes_runs():
+    sorter = ExternalSorter(key, max_rows=10)
+    sorter.extend(get_rows(100))
+    assert sorter.spilled
+
+    sorter.close()
+
+    assert not sorter.spilled
+    assert sorter.sorted() == []
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'max_rows': 0},
+    {'max_rows': 1, 'max_runs': 1},
+])
+def test_invalid_limits(kwargs):
+    with pytest.raises(ValueError):
+        ExternalSorter(key, **kwargs)
@@ -0,0 +1,105 @@
+import asyncio
+
+from sqlalchemy import Enum, column, select, sql, table
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+
+from excel_api.queries import iter_objects_server_side
+
+T = table('t', column('id'), column('status', Enum('new', 'done')))
+
+
+class Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        self.conn.log.append('BEGIN')
+
+    async def __aexit__(self, *exc):
+        self.conn.log.append('COMMIT')
+
+
+class Connection:
+    """Соединение aiopg: компилирует запрос диалектом соединения
+    и отдает строки FETCH пакетами из rows.
+    """
+    _dialect = PGDialect_psycopg2()
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.log = []
+        self.queries = []
+
+    def begin(self):
+        return Transaction(self)
+
+    async def execute(self, query):
+        compiled = query.compile(dialect=self._dialect)
+        self.log.append(str(compiled))
+        self.queries.append((query, compiled.construct_params()))
+        if not str(compiled).startswith('FETCH'):
+            return Cursor([])
+        size = int(str(compiled).split()[2])
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return Cursor(rows)
+
+
+def fetch_all(conn, query, size):
+    async def main():
+        return [batch async for batch in
+                iter_objects_server_side(conn, query, size)]
+
+    return asyncio.run(main())
+
+
+def test_server_side_cursor_batches():
+    conn = Connection(list(range(5)))
+    query = select([T]).where(T.c.status == 'done')
+
+    batches = fetch_all(conn, query, 2)
+
+    assert batches == [[0, 1], [2, 3], [4]]
+    name = conn.log[1].split()[1]
+    assert conn.log[0] == 'BEGIN'
+    assert conn.log[1] == (
+        f'DECLARE {name} NO SCROLL CURSOR FOR '
+        'SELECT t.id, t.status \nFROM t \nWHERE t.status = %(status_1)s')
+    assert conn.log[2:-1] == [f'FETCH FORWARD 2 FROM {name}'] * 4
+    assert conn.log[-1] == 'COMMIT'
+
+
+def test_server_side_cursor_params_and_columns():
+    conn = Connection([])
+    query = select([T.c.id, T.c.status.label('state')]).where(
+        T.c.status == 'done')
+
+    fetch_all(conn, query, 10)
+
+    (declare, params), (fetch, _) = conn.queries
+    # Параметры и их типы передаются соединению вместе с запросом
+    assert params == {'status_1': 'done'}
+    assert declare.compile().binds['status_1'].type is T.c.status.type
+    # Строки FETCH приводятся по типам столбцов запроса
+    assert isinstance(fetch, sql.expression.TextAsFrom)
+    assert [(c.key, c.type) for c in fetch.c] == [
+        ('id', T.c.id.type), ('state', T.c.status.type)]
+
+
+def test_cursor_names_are_unique():
+    first, second = Connection([]), Connection([])
+
+    fetch_all(first, select([T]), 10)
+    fetch_all(second, select([T]), 10)
+
+    assert first.log[1].split()[1] != second.log[1].split()[1]
@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+
+from excel_api import ref_cache
+from excel_api.ref_cache import ReferenceCache
+
+
+class Acquire:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class Engine:
+    def acquire(self):
+        return Acquire()
+
+
+class App(dict):
+    """Приложение aiohttp: хранилище и сигналы запуска и остановки."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.on_startup = []
+        self.on_cleanup = []
+
+
+class Loader:
+    """Загрузка справочника: возвращает текущее значение value."""
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.error = None
+        self.delay = 0
+
+    async def __call__(self, conn):
+        self.calls += 1
+        value = self.value
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return value
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(ref_cache, 'monotonic', lambda: now[0])
+    return now
+
+
+def get_cache(loader, ttl=10):
+    app = App(db=Engine())
+    cache = ReferenceCache(ttl=ttl)
+    cache.register('langs', loader)
+    cache.setup(app)
+    return cache
+
+
+async def settle():
+    """Завершение фоновых задач обновления."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_loaded_once_while_fresh(clock):
+    loader = Loader({1: 'ru'})
+    cache = get_cache(loader)
+
+    async def main():
+        await cache.warm()
+        values = await asyncio.gather(*(cache.get('langs') for _ in range(5)))
+        return values
+
+    values = asyncio.run(main())
+
+    assert all(dict(value) == {1: 'ru'} for value in values)
+    assert loader.calls == 1
+
+
+def test_stale_value_is_served_while_revalidating(clock):
+    loader = Loader({1: 'ru'})
+    cache = get_cache(loader)
+
+    async def main():
+        await cache.get('langs')
+        version = cache.get_version('langs')
+        loader.value = {1: 'RU'}
+        clock[0] = 11
+
+        stale = await cache.get('langs')
+        await settle()
+        fresh = await cache.get('langs')
+        return stale, fresh, version
+
+    stale, fresh, version = asyncio.run(main())
+
+    assert dict(stale) == {1: 'ru'}
+    assert dict(fresh) == {1: 'RU'}
+    assert loader.calls == 2
+    assert cache.get_version('langs') != version
+
+
+def test_refresh_error_keeps_value(clock):
+    loader = Loader({1: 'ru'})
+    cache = get_cache(loader)
+
+    async def main():
+        await cache.get('langs')
+        loader.error = RuntimeError('db is down')
+        clock[0] = 11
+        await cache.get('langs')
+        await settle()
+        # До повторной попытки справочник не обновляется
+        value = await cache.get('langs')
+        await settle()
+        calls = loader.calls
+        clock[0] = 11 + ReferenceCache.RETRY_DELAY
+        await cache.get('langs')
+        await settle()
+        return value, calls
+
+    value, calls = asyncio.run(main())
+
+    assert dict(value) == {1: 'ru'}
+    assert calls == 2
+    assert loader.calls == 3
+
+
+def test_invalidate_during_load_is_not_lost(clock):
+    loader = Loader({1: 'ru'})
+    loader.delay = 0.01
+    cache = get_cache(loader)
+
+    async def main():
+        task = asyncio.ensure_future(cache.get('langs'))
+        await asyncio.sleep(0)
+        loader.value = {1: 'RU'}
+        cache.invalidate('langs')
+        return await task
+
+    assert dict(asyncio.run(main())) == {1: 'RU'}
+    assert loader.calls == 2
+
+
+def test_version_is_content_digest(clock):
+    first = get_cache(Loader({1: 'ru', 2: 'en'}))
+    second = get_cache(Loader({2: 'en', 1: 'ru'}))
+    other = get_cache(Loader({1: 'ru'}))
+
+    async def main(cache):
+        assert cache.get_version('langs') is None
+        await cache.get('langs')
+        return cache.get_version('langs')
+
+    version = asyncio.run(main(first))
+    assert version == asyncio.run(main(second))
+    assert version != asyncio.run(main(other))
+
+    first.invalidate()
+    assert first.get_version('langs') is None
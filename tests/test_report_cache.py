@@ -0,0 +1,119 @@
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import column, select, table
+
+from excel_api.report_cache import PartitionStore, ReportCache
+
+
+def set_access_time(cache, key, ts):
+    path = os.path.join(cache.dir, key + cache.BODY)
+    os.utime(path, (ts, ts))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ReportCache(str(tmp_path / 'cache'), max_size=250)
+
+
+def test_put_and_get(cache):
+    cache.put('a', 'report.xlsx', b'body')
+
+    assert cache.get('a') == ('report.xlsx', b'body')
+    assert cache.get('missing') is None
+
+
+def test_lru_eviction(cache):
+    for ts, key in enumerate('abc', start=1000):
+        cache.put(key, f'{key}.xlsx', b'x' * 100)
+        set_access_time(cache, key, ts)
+    # Книга c вытеснила a - давно не запрашиваемую
+    assert cache.get('a') is None
+
+    # Обращение к b делает давно не запрашиваемой c
+    set_access_time(cache, 'c', 2000)
+    cache.get('b')
+    cache.put('d', 'd.xlsx', b'x' * 100)
+
+    assert cache.get('b') is not None
+    assert cache.get('c') is None
+    assert cache.get('d') is not None
+
+
+def test_invalidate(cache):
+    cache.put('a', 'a.xlsx', b'a')
+    cache.put('b', 'b.xlsx', b'b')
+
+    cache.invalidate('a')
+    assert cache.get('a') is None
+    assert cache.get('b') is not None
+
+    cache.invalidate()
+    assert cache.get('b') is None
+
+
+@pytest.mark.parametrize('header, matched', [
+    (None, False),
+    ('', False),
+    ('"key"', True),
+    ('W/"key"', True),
+    ('"other", "key"', True),
+    ('*', True),
+    ('"other"', False),
+])
+def test_match_etag(header, matched):
+    etag = ReportCache.get_etag('key')
+
+    assert ReportCache.match_etag(etag, header) is matched
+
+
+def test_fingerprint_depends_on_query_params():
+    t = table('t', column('id'), column('source'))
+    query = select([t])
+
+    key = ReportCache.fingerprint(query=query.where(t.c.source == 1),
+                                    sheets_list={'a', 'b'})
+
+    assert key == ReportCache.fingerprint(
+        query=query.where(t.c.source == 1), sheets_list={'b', 'a'})
+    assert key != ReportCache.fingerprint(
+        query=query.where(t.c.source == 2), sheets_list={'a', 'b'})
+
+
+
+def test_partitions_roundtrip(tmp_path):
+    store = PartitionStore(str(tmp_path / 'parts'), 1 << 20, chunk_size=7)
+    day = date(2020, 1, 1)
+    rows = [{'id': i} for i in range(50)]
+
+    assert store.load('key', day) is None
+    store.save('key', day, iter(rows))
+
+    assert list(store.load('key', day)) == rows
+    assert store.load('key', date(2020, 1, 2)) is None
+
+
+def test_failed_partition_leaves_no_files(tmp_path):
+    store = PartitionStore(str(tmp_path / 'parts'), 1 << 20, chunk_size=7)
+
+    def rows():
+        yield from ({'id': i} for i in range(20))
+        raise RuntimeError('broken rows')
+
+    with pytest.raises(RuntimeError):
+        store.save('key', date(2020, 1, 1), rows())
+
+    assert os.listdir(store.dir) == []
+
+
+def test_failed_write_leaves_no_files(cache, monkeypatch):
+    def replace(src, dst):
+        raise OSError('disk is full')
+
+    monkeypatch.setattr(os, 'replace', replace)
+
+    with pytest.raises(OSError):
+        cache.put('a', 'a.xlsx', b'body')
+
+    assert os.listdir(cache.dir) == []
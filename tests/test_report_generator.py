@@ -0,0 +1,612 @@
+import asyncio
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+from itertools import count
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+from openpyxl import load_workbook
+from sqlalchemy import column, select, table
+
+from excel_api.excel_generator import (
+    ExcelGenerator,
+    ExcelSheetBase,
+    ReportGenerator,
+    SortSpec,
+    _limit_batches,
+)
+from excel_api.external_sort import ExternalSorter
+from excel_api.ref_cache import ReferenceCache
+from excel_api.report_cache import PartitionStore, ReportCache
+from excel_api.row_store import RowStore
+
+REPORT = ExcelSheetBase.REPORT_SHORT
+STATISTIC = ExcelSheetBase.STATISTIC
+CREATED_AT = ExcelSheetBase.CREATED_AT
+
+T = table('t', column('id'), column('v'), column('ts'))
+# Каждое чтение дня возвращает новые значения
+FETCHES = count()
+
+SHEETS = {
+    REPORT: {
+        'sheet': {
+            '№':            ExcelSheetBase.ROW_NUM,
+            'Значение':     'v',
+        },
+        'sheet_name':       'Отчет',
+    },
+}
+
+
+class RowProxy(tuple):
+    """Строка выборки aiopg: значения столбцов по индексу и по имени."""
+    KEYS = ('id', 'v')
+
+    def keys(self):
+        return self.KEYS
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self.KEYS.index(key)
+        return super().__getitem__(key)
+
+
+def get_rows(count, seed=0):
+    rnd = random.Random(seed)
+    return [RowProxy((i, rnd.randrange(10 ** 6))) for i in range(count)]
+
+
+class Cursor:
+    def __init__(self, engine, rows):
+        self.rows = rows
+        self.closed = False
+        engine.cursors.append(self)
+
+    async def fetchall(self):
+        return self.rows
+
+    async def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class Connection:
+    """Соединение aiopg: выполняет запросы над строками engine.
+
+    Строки упорядочены по v, только если запрос содержит ORDER BY.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def execute(self, query, *args):
+        self.engine.queries.append(str(query))
+        rows = list(self.engine.rows)
+        if 'ORDER BY' in str(query):
+            rows.sort(key=lambda row: row[1])
+        return Cursor(self.engine, rows)
+
+
+class Acquire:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def __aenter__(self):
+        return Connection(self.engine)
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class Engine:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.cursors = []
+
+    def acquire(self):
+        return Acquire(self)
+
+
+class Workbook(ExcelGenerator):
+    """Книга отчета, генерируемая в процессе исполнителя."""
+    ALL = SHEETS
+
+
+class Report(ReportGenerator):
+    ALL = SHEETS
+    FETCH_SIZE = 300
+    SORT = {REPORT: lambda data: data['v']}
+    SORT_SPECS = {}
+
+    def _get_excel_job(self):
+        _, *job = super()._get_excel_job()
+        return (Workbook, *job)
+
+    def _generate_report_row(self, obj, sheet_key):
+        return {'v': obj['v']}
+
+    async def _generate_statistic_data(self, sheet_key):
+        await self.get_obj()
+        return []
+
+
+class SortedReport(Report):
+    SORT_SPECS = {REPORT: (SortSpec('v'),)}
+
+
+def get_report(cls, rows, **kwargs):
+    return cls({'db': Engine(rows)}, select([T]), violation_form='v',
+                sheets_list=[REPORT], **kwargs)
+
+
+def read_values(response) -> list:
+    ws = load_workbook(BytesIO(response.body))['Отчет']
+    return [value for value, in ws.iter_rows(min_row=2, min_col=2,
+                                                values_only=True)]
+
+
+def get_workbook_values(report) -> list:
+    async def main():
+        await report.generate_data()
+        return await report.get_response_async()
+
+    return read_values(asyncio.run(main()))
+
+
+def test_time_column_styles_are_per_instance():
+    report = ReportGenerator({}, select([T]), violation_form='v',
+                                time_column=True)
+    other = ReportGenerator({}, select([T]), violation_form='v')
+
+    report._set_report_styles()
+    other._set_report_styles()
+
+    sheet_style = ReportGenerator.EXCEL_SHEET
+    assert report.EXCEL_SHEET.get_style(CREATED_AT).cell is (
+        sheet_style.CELL_DATETIME_STYLE)
+    assert other.EXCEL_SHEET.get_style(CREATED_AT).cell is (
+        sheet_style.CELL_DATE_STYLE)
+    assert ReportGenerator.EXCEL_SHEET.get_style(CREATED_AT).cell is (
+        sheet_style.CELL_DATE_STYLE)
+
+
+def test_stream_rows_from_database():
+    rows = get_rows(1000)
+    report = get_report(SortedReport, rows, stream=True)
+
+    async def main():
+        data = await report.generate_data()
+        # Строки таблицы не собраны: они читаются при записи книги
+        assert hasattr(data[REPORT], '__aiter__')
+        assert not report.engine.queries
+        return await report.get_response_async()
+
+    values = read_values(asyncio.run(main()))
+
+    assert values == sorted(row[1] for row in rows)
+    assert all(cursor.closed for cursor in report.engine.cursors)
+
+
+def test_stream_rows_to_process_pool():
+    rows = get_rows(500)
+
+    with ProcessPoolExecutor(1) as executor:
+        values = get_workbook_values(
+            get_report(SortedReport, rows, stream=True, executor=executor))
+
+    assert values == sorted(row[1] for row in rows)
+
+
+class FailingReport(SortedReport):
+    def _generate_report_row(self, obj, sheet_key):
+        if obj['id'] == 700:
+            raise RuntimeError('bad row')
+        return super()._generate_report_row(obj, sheet_key)
+
+
+def test_interrupted_stream_closes_cursor():
+    report = get_report(FailingReport, get_rows(1000), stream=True)
+
+    with pytest.raises(RuntimeError):
+        get_workbook_values(report)
+
+    assert report.engine.cursors
+    assert all(cursor.closed for cursor in report.engine.cursors)
+
+
+def test_get_obj_reads_compact_store_once():
+    rows = get_rows(100)
+    report = get_report(Report, rows)
+
+    async def main():
+        obj_list = await report.get_obj(to_dict=False)
+        assert await report.get_obj(to_dict=False) is obj_list
+        return obj_list
+
+    obj_list = asyncio.run(main())
+
+    assert isinstance(obj_list, RowStore)
+    assert len(report.engine.queries) == 1
+    assert len(obj_list) == len(rows)
+    assert report.obj[42]['v'] == rows[42][1]
+
+
+def test_sort_specs_compile_to_order_by():
+    specs = (
+        SortSpec('v', SortSpec.DESC, SortSpec.NULLS_LAST),
+        SortSpec('id', nulls=SortSpec.NULLS_FIRST),
+    )
+    query = select([T]).order_by(*(spec.to_clause() for spec in specs))
+
+    assert str(query).endswith(
+        'ORDER BY v DESC NULLS LAST, id ASC NULLS FIRST')
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'direction': 'up'},
+    {'nulls': 'middle'},
+])
+def test_sort_spec_validation(kwargs):
+    with pytest.raises(ValueError):
+        SortSpec('v', **kwargs)
+
+
+def test_report_sorted_in_database():
+    rows = get_rows(500)
+    report = get_report(SortedReport, rows)
+
+    data = asyncio.run(report.generate_data())
+
+    assert [row['v'] for row in data[REPORT]] == sorted(
+        row[1] for row in rows)
+    assert report.engine.queries == [str(report._get_report_query(REPORT))]
+    assert 'ORDER BY v ASC' in report.engine.queries[0]
+
+
+def test_sort_is_kept_when_data_read_by_another_sheet():
+    rows = get_rows(500)
+    report = get_report(SortedReport, rows)
+
+    # Статистика читает данные первой, без сортировки таблицы отчета
+    data = asyncio.run(report.generate_data([STATISTIC, REPORT]))
+
+    assert 'ORDER BY' not in report.engine.queries[0]
+    assert [row['v'] for row in data[REPORT]] == sorted(
+        row[1] for row in rows)
+
+
+class SpilledReport(Report):
+    SORT_MAX_ROWS = 100
+
+
+def test_spilled_data_through_process_pool():
+    rows = get_rows(1000)
+
+    async def main(report):
+        await report.generate_data()
+        # Данные таблицы выгружены на диск и читаются слиянием
+        assert not isinstance(report.data[REPORT], list)
+        return await report.get_response_async()
+
+    with ProcessPoolExecutor(2) as executor:
+        report = get_report(SpilledReport, rows, executor=executor)
+        values = read_values(asyncio.run(main(report)))
+
+    assert values == sorted(row[1] for row in rows)
+
+
+def test_stream_without_sort_specs_is_sorted():
+    rows = get_rows(1000)
+    report = get_report(SpilledReport, rows, stream=True)
+
+    values = get_workbook_values(report)
+
+    assert 'ORDER BY' not in report.engine.queries[0]
+    assert values == sorted(row[1] for row in rows)
+
+
+class ConcurrentReport(Report):
+    SHEETS_CONCURRENCY = 2
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.running = 0
+        self.max_running = 0
+        self.cancelled = []
+
+    async def _generate_sheet_data(self, sheet_key):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            if sheet_key == 'bad':
+                raise RuntimeError('bad sheet')
+            if sheet_key == 'slow':
+                await asyncio.sleep(10)
+            return [sheet_key]
+        except asyncio.CancelledError:
+            self.cancelled.append(sheet_key)
+            raise
+        finally:
+            self.running -= 1
+
+
+def test_sheets_generated_concurrently_with_limit():
+    report = get_report(ConcurrentReport, [])
+
+    data = asyncio.run(report.generate_data(['a', 'b', 'c', 'd']))
+
+    assert report.max_running == ConcurrentReport.SHEETS_CONCURRENCY
+    assert all(data[key] == [key] for key in 'abcd')
+
+
+def test_failed_sheet_cancels_others():
+    report = get_report(ConcurrentReport, [])
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(report.generate_data(['slow', 'bad']))
+
+    assert report.cancelled == ['slow']
+
+
+def test_sheets_share_one_fetch():
+    report = get_report(Report, get_rows(100))
+
+    asyncio.run(report.generate_data([STATISTIC, REPORT]))
+
+    assert len(report.engine.queries) == 1
+
+
+def test_stream_batches_hold_semaphore():
+    async def batches():
+        yield [1]
+        yield [2]
+
+    async def main():
+        semaphore = asyncio.Semaphore(1)
+        limited = _limit_batches(batches(), semaphore)
+        # Место семафора занимается при чтении первого пакета
+        assert not semaphore.locked()
+        assert await limited.__anext__() == [1]
+        assert semaphore.locked()
+        assert [batch async for batch in limited] == [[2]]
+        assert not semaphore.locked()
+
+        limited = _limit_batches(batches(), semaphore)
+        await limited.__anext__()
+        await limited.aclose()
+        assert not semaphore.locked()
+
+    asyncio.run(main())
+
+
+class CachedReport(Report):
+    async def get_data_version(self):
+        return 'v1'
+
+
+def test_cached_response(tmp_path, monkeypatch):
+    monkeypatch.setattr(CachedReport, 'CACHE',
+                        ReportCache(str(tmp_path / 'cache'), 1 << 20))
+    engine = Engine(get_rows(100))
+
+    def get_response(headers={}):
+        report = CachedReport({'db': engine}, select([T]),
+                                violation_form='v', sheets_list=[REPORT])
+        request = make_mocked_request('GET', '/report', headers=headers)
+        return asyncio.run(report.get_cached_response(request))
+
+    response = get_response()
+    etag = response.headers['ETag']
+    assert response.status == 200
+    assert len(engine.queries) == 1
+
+    # Клиент уже получил книгу
+    response = get_response({'If-None-Match': etag})
+    assert response.status == 304
+    assert not response.body
+
+    # Книга берется из кэша без чтения данных
+    cached = get_response()
+    assert cached.status == 200
+    assert cached.headers['ETag'] == etag
+    assert read_values(cached) == sorted(row[1] for row in engine.rows)
+    assert len(engine.queries) == 1
+
+
+class RecordingSorter(ExternalSorter):
+    closed = []
+
+    def close(self):
+        self.closed.append(self)
+        super().close()
+
+
+class PartitionedReport(Report):
+    SORT_MAX_ROWS = 7
+    PARTITION_COLUMN = 'ts'
+
+    def __init__(self, *args, period, version, fetched, fail_day=None,
+                    **kwargs):
+        super().__init__(*args, **kwargs)
+        self.period = period
+        self.version = version
+        self.fetched = fetched
+        self.fail_day = fail_day
+
+    def get_period(self):
+        return self.period
+
+    async def get_data_version(self):
+        return self.version
+
+    def _get_sorter(self, sheet_key):
+        return RecordingSorter(self.SORT[sheet_key], self.SORT_MAX_ROWS)
+
+    async def _fetch_obj(self, query=None):
+        day = min(v for v in query.compile().params.values()
+                    if isinstance(v, datetime)).date()
+        if day == self.fail_day:
+            raise RuntimeError('database is gone')
+        self.fetched.append(day)
+        # Значения всех чтений различны
+        start = next(FETCHES) * 100
+        store = RowStore()
+        store.extend([RowProxy((i, start + (i * 37) % 50))
+                        for i in range(50)])
+        return store.compact()
+
+
+@pytest.fixture
+def partitions(tmp_path, monkeypatch):
+    store = PartitionStore(str(tmp_path / 'partitions'), 1 << 20)
+    monkeypatch.setattr(PartitionedReport, 'PARTITIONS', store)
+    return store
+
+
+def generate_partitioned(version, **kwargs):
+    today = datetime.now(PartitionedReport.MSC_TIMEZONE).date()
+    fetched = []
+    report = PartitionedReport({}, select([T]), violation_form='v',
+                                period=(today - timedelta(2), today),
+                                version=version, fetched=fetched, **kwargs)
+    data = asyncio.run(report.generate_data([REPORT]))
+    return [row['v'] for row in data[REPORT]], fetched
+
+
+def test_stale_partitions_are_refetched(partitions):
+    today = datetime.now(PartitionedReport.MSC_TIMEZONE).date()
+
+    first, fetched = generate_partitioned('a')
+    assert len(fetched) == 3
+    assert first == sorted(first) and len(first) == 150
+
+    # Закрытые дни берутся из кэша, текущий день читается заново
+    cached, fetched = generate_partitioned('a')
+    assert fetched == [today]
+    assert cached == sorted(cached)
+    assert len(set(first) & set(cached)) == 100
+
+    # Изменение данных делает разделы устаревшими
+    changed, fetched = generate_partitioned('b')
+    assert len(fetched) == 3
+    assert changed == sorted(changed)
+    assert not set(changed) & set(first)
+
+
+def test_partitions_without_data_version_are_not_cached(partitions):
+    first, fetched = generate_partitioned(None)
+    assert len(fetched) == 3
+
+    # Без версии данных нельзя узнать, что раздел устарел
+    second, fetched = generate_partitioned(None)
+    assert len(fetched) == 3
+    assert second == sorted(second)
+    assert not set(first) & set(second)
+    assert not os.path.exists(partitions.dir) or not os.listdir(
+        partitions.dir)
+
+
+def test_failed_partition_fetch_closes_sorter(partitions):
+    today = datetime.now(PartitionedReport.MSC_TIMEZONE).date()
+    RecordingSorter.closed.clear()
+
+    with pytest.raises(RuntimeError):
+        generate_partitioned('a', fail_day=today)
+
+    # Сортировщики разделов и слияния закрыты
+    assert len(RecordingSorter.closed) == 3
+
+
+class TimestampRow(RowProxy):
+    KEYS = ('id', 'v', 'ts')
+
+
+class TimestampReport(Report):
+    TIMESTAMP_COLUMNS = ('ts',)
+
+    def _generate_report_row(self, obj, sheet_key):
+        return {'v': obj['v'], 'ts': obj['ts']}
+
+    async def _generate_statistic_data(self, sheet_key):
+        return [obj['ts'] for obj in await self.get_obj(to_dict=False)]
+
+
+def test_timestamps_converted_for_report_rows_only():
+    timestamps = [0, 86400, None]
+    rows = [TimestampRow((i, i, ts)) for i, ts in enumerate(timestamps)]
+    report = get_report(TimestampReport, rows)
+
+    data = asyncio.run(report.generate_data([REPORT, STATISTIC]))
+
+    assert [row['ts'] for row in data[REPORT]] == pytest.approx(
+        [25569 + 3 / 24, 25570 + 3 / 24, None])
+    # Данные, общие для таблиц отчета, не приведены
+    assert data[STATISTIC] == timestamps
+    assert [obj['ts'] for obj in report.obj_list] == timestamps
+
+
+class CountingRef(dict):
+    """Справочник, считающий обращения к значениям."""
+    lookups = 0
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return super().__getitem__(key)
+
+
+def test_join_refs_memoised_per_version():
+    report = get_report(Report, [])
+    report.languages = CountingRef({1: 'ru', 2: 'en'})
+    delimiter = report.DELIMITER
+
+    assert report.join_refs('languages', [1, 2]) == f'ru{delimiter}en'
+    assert report.join_refs('languages', (1, 2)) == f'ru{delimiter}en'
+    assert report.languages.lookups == 2
+    assert report.join_refs('languages', []) == report.NULL_SYMB
+    with pytest.raises(KeyError):
+        report.join_refs('languages', [3])
+
+    # Новая версия справочника формирует строку заново
+    report.languages[1] = 'be'
+    report.ref_versions['languages'] = 2
+    assert report.join_refs('languages', [1, 2]) == f'be{delimiter}en'
+
+
+def test_get_refs_reads_app_cache():
+    calls = []
+
+    async def load_languages(conn):
+        calls.append(conn)
+        return {1: 'ru', 2: 'en'}
+
+    app = web.Application()
+    app['db'] = Engine([])
+    refs = ReferenceCache(ttl=60)
+    refs.register('languages', load_languages)
+    refs.setup(app)
+
+    async def main():
+        reports = [Report(app, select([T]), violation_form='v')
+                    for _ in range(2)]
+        for report in reports:
+            await report.get_refs('languages')
+        return reports
+
+    reports = asyncio.run(main())
+
+    # Справочник загружен однажды и общий для отчетов
+    assert len(calls) == 1
+    assert reports[0].languages is reports[1].languages
+    assert reports[0].get_ref_version('languages') == (
+        refs.get_version('languages'))
+    assert reports[1].join_refs('languages', [2, 1]) == (
+        f'en{Report.DELIMITER}ru')
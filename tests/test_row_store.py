@@ -0,0 +1,95 @@
+from array import array
+
+import pytest
+
+from excel_api.row_store import RowStore
+
+
+class RowProxy(tuple):
+    """Строка выборки aiopg: значения столбцов и их имена."""
+    KEYS = ('id', 'name', 'score')
+
+    def keys(self):
+        return self.KEYS
+
+
+def get_store(ids):
+    store = RowStore()
+    store.extend([RowProxy((i, f'name{i}', i / 2)) for i in ids])
+    return store
+
+
+def test_rows_by_name_and_position():
+    store = get_store(range(3))
+
+    row = store[1]
+    assert row['name'] == 'name1'
+    assert row[2] == 0.5
+    assert row.get('missing', '-') == '-'
+    assert 'score' in row
+    assert row.keys() == RowProxy.KEYS
+    assert row == (1, 'name1', 0.5)
+    assert store[-1]['id'] == 2
+    assert [r['id'] for r in store[1:]] == [1, 2]
+    with pytest.raises(IndexError):
+        store[3]
+
+
+def test_compact_uses_typed_arrays():
+    store = get_store(range(3)).compact()
+
+    ids, names, scores = store.columns
+    assert isinstance(ids, array) and ids.typecode == 'q'
+    assert isinstance(names, tuple)
+    assert isinstance(scores, array) and scores.typecode == 'd'
+    assert [r['name'] for r in store] == ['name0', 'name1', 'name2']
+
+
+def test_compact_keeps_bool_and_none():
+    store = RowStore(keys=('flag', 'value'))
+    store.extend([(True, 1), (False, None)])
+    store.compact()
+
+    assert store.columns == [(True, False), (1, None)]
+
+
+def test_convert_column():
+    store = get_store(range(3)).compact()
+    store.convert('id', lambda column: [v * 10 for v in column])
+
+    assert [r['id'] for r in store] == [0, 10, 20]
+
+
+@pytest.mark.parametrize('ids', [[1, 3, 5, 7], [7, 1, 5, 3]])
+def test_index_lookup(ids):
+    store = get_store(ids).compact()
+    index = store.get_index()
+
+    assert index[5]['name'] == 'name5'
+    assert 4 not in index
+    assert 'x' not in index
+    assert len(index) == 4
+    assert sorted(index) == [1, 3, 5, 7]
+    with pytest.raises(KeyError):
+        index[4]
+    assert store.get_index() is index
+
+
+def test_index_is_rebuilt_after_extend():
+    store = get_store([1, 2])
+    index = store.get_index()
+    store.extend([RowProxy((3, 'name3', 1.5))])
+
+    assert store.get_index() is not index
+    assert store.get_index()[3]['name'] == 'name3'
+
+
+def test_copy_converts_independently():
+    store = get_store(range(5)).compact()
+
+    copy = store.copy().convert(
+        'score', lambda column: [value * 2 for value in column])
+
+    assert [row['score'] for row in copy] == [i for i in range(5)]
+    assert [row['score'] for row in store] == [i / 2 for i in range(5)]
+    assert copy.get_index('id')[3]['name'] == 'name3'